@@ -0,0 +1,171 @@
+"""
+Checks that the alternative backtest modes match the event driven engine.
+
+Reference strategies are run on synthetic bars in a bar store under a 
+temporary TWSQROOT with offline data enabled, as in the benchmarks, 
+once with the plain BacktestRunner and once per mode. Positions, 
+portfolio values and orders must match:
+
+	python benchmarks/check_modes.py
+
+Exits with status 1 and lists the differences on a mismatch.
+"""
+import os 
+import shutil
+import sys 
+import tempfile
+
+END_TS = '2024-01-01'
+DAYS = 20
+
+# bars before the backtest start for lookbacks
+WARMUP_DAYS = 2
+
+def write_data(freq, n_symbols, gaps=()):
+	# gaps are (symbol number, first bar, number of bars) to drop
+	import pandas as pd 
+	from twsq.paths import DATA_PATH
+	from twsq.data.bar_store import BarStore
+	from run_benchmarks import make_bars, symbols, freq_offset
+
+	store = BarStore(os.path.join(DATA_PATH, 'Binance'))
+	n_bars = int(pd.Timedelta(DAYS + WARMUP_DAYS, 'D') 
+		/ pd.Timedelta(freq_offset(freq))) + 1
+
+	for i, symbol in enumerate(symbols(n_symbols)):
+		bars = make_bars(n_bars, freq, i)
+		for j, start, n in gaps:
+			if j == i:
+				bars = bars.drop(bars.index[start:start + n])
+		store.delete(symbol, freq)
+		store.append(bars, symbol, freq)
+
+	return symbols(n_symbols)
+
+def run(Alpha, freq, runner=None, **params):
+	import pandas as pd 
+	from twsq.exec import BacktestBinance, BacktestRunner
+
+	end_ts = pd.Timestamp(END_TS)
+	start_ts = end_ts - pd.Timedelta(DAYS, 'D')
+
+	runner = runner or BacktestRunner
+	kwargs = {x: params.pop(x) for x in ('fast',) if x in params}
+
+	alpha = Alpha(BacktestBinance(), freq = freq, **params)
+	runner = runner(alpha, start_ts, end_ts, save = False, verbose = False, 
+		**kwargs)
+	runner.run()
+
+	if runner.error is not None:
+		raise runner.error
+
+	return alpha
+
+def compare(expected, result):
+	# differences between two finished alphas, as messages
+	import numpy as np
+
+	problems = []
+	a, b = expected.pos_pnl, result.pos_pnl
+
+	if list(a.columns) != list(b.columns):
+		problems.append(f'pos_pnl columns {list(a.columns)} != {list(b.columns)}')
+	elif not a.index.equals(b.index):
+		problems.append('pos_pnl dates differ')
+	else:
+		for col in a.columns:
+			# portfolio values are summed in a different order
+			if not np.allclose(a[col].values, b[col].values, rtol=1e-9, atol=1e-6):
+				problems.append(f'pos_pnl {col} differs by up to '
+					f'{np.abs(a[col].values - b[col].values).max():g}')
+
+	a, b = expected.orders, result.orders
+	if (a is None) or (b is None) or (a.shape != b.shape):
+		problems.append('orders differ in shape')
+		return problems
+
+	for col in a.columns:
+		x, y = a[col], b[col]
+		if x.dtype.kind in 'biuf' and y.dtype.kind in 'biuf':
+			same = np.allclose(x.values, y.values, rtol=1e-9, equal_nan=True)
+		else:
+			# missing values in the same places count as equal
+			same = x.astype(object).reset_index(drop=True)\
+				.equals(y.astype(object).reset_index(drop=True))
+
+		if not same:
+			problems.append(f'orders {col} differ')
+
+	return problems
+
+def check_vectorized():
+	import strategies
+	from twsq.exec import VectorizedBacktestRunner
+
+	symbols = write_data('1h', 5)
+	expected = run(strategies.TargetRebalance, '1h', symbols = symbols)
+	result = run(strategies.TargetRebalance, '1h', VectorizedBacktestRunner, 
+		symbols = symbols)
+	return compare(expected, result)
+
+def check_fast():
+	import strategies
+
+	# missing bars leave market orders to fill on the next bar
+	symbols = write_data('1h', 5, gaps = [(1, 100, 3)])
+	problems = []
+	for Alpha in (strategies.TargetRebalance, strategies.LimitLadder):
+		expected = run(Alpha, '1h', symbols = symbols)
+		result = run(Alpha, '1h', symbols = symbols, fast = True)
+		problems += [f'{Alpha.__name__} {x}' for x in compare(expected, result)]
+	return problems
+
+def check_skip():
+	import strategies
+
+	symbols = write_data('1h', 5, gaps = [(1, 100, 3)])
+	expected = run(strategies.DailyQuotes, '1h', symbols = symbols, skip = False)
+
+	problems = []
+	for fast in (False, True):
+		result = run(strategies.DailyQuotes, '1h', symbols = symbols, 
+			skip = True, fast = fast)
+		problems += [f'fast={fast} {x}' for x in compare(expected, result)]
+	return problems
+
+CHECKS = [
+	('vectorized', check_vectorized),
+	('fast', check_fast),
+	('skip', check_skip),
+	]
+
+def main():
+	failed = False
+	for name, check in CHECKS:
+		problems = check()
+		print(f'{name}: {"ok" if not problems else "FAILED"}')
+		for problem in problems:
+			print(f'  {problem}')
+		failed |= bool(problems)
+
+	return failed
+
+if __name__ == '__main__':
+	root = tempfile.mkdtemp(prefix = 'twsq_check_')
+	os.environ['TWSQROOT'] = root
+
+	# must be set before twsq is imported
+	with open(os.path.join(root, 'settings.yml'), 'w') as handle:
+		handle.write('data:\n  offline: true\n')
+
+	here = os.path.dirname(os.path.abspath(__file__))
+	sys.path.insert(0, os.path.dirname(here))
+	sys.path.insert(0, here)
+
+	try:
+		failed = main()
+	finally:
+		shutil.rmtree(root, ignore_errors = True)
+
+	sys.exit(1 if failed else 0)
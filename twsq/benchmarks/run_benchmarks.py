@@ -0,0 +1,233 @@
+"""
+Backtest throughput benchmarks on synthetic data.
+
+Random-walk OHLCV bars are written to a bar store under a temporary 
+TWSQROOT with offline data enabled, so nothing touches the network. 
+Each scenario runs through Alpha.run_backtest in its own process so 
+peak memory is measured per scenario. Results are written as JSON:
+
+	python benchmarks/run_benchmarks.py --out results.json
+	python benchmarks/run_benchmarks.py --quick --scenario ladder_1h_5
+
+Compare two result files by scenario name to see the effect of a change.
+"""
+import argparse
+import json 
+import os 
+import platform
+import shutil
+import subprocess
+import sys 
+import tempfile
+from datetime import datetime
+from time import perf_counter
+
+# bars end here so every backtest is well in the past
+END_TS = '2024-01-01'
+
+# name, strategy, freq, number of symbols, days, strategy params
+SCENARIOS = [
+	('target_1h_5', 'TargetRebalance', '1h', 5, 180, {}),
+	('target_1m_5', 'TargetRebalance', '1m', 5, 7, {'lookback': 60}),
+	('target_1h_50', 'TargetRebalance', '1h', 50, 60, {}),
+	('ladder_1h_5', 'LimitLadder', '1h', 5, 90, {'levels': 5}),
+	('ladder_15m_10', 'LimitLadder', '15m', 10, 14, {'levels': 10}),
+	]
+
+# bars before the backtest start for lookbacks
+WARMUP_DAYS = 2
+
+def symbols(n):
+	return ['S%03d/USDT' % i for i in range(n)]
+
+def freq_offset(freq):
+	# pandas offset alias, IE. '15m' > '15min'
+	return freq[:-1] + {'m':'min','h':'h','d':'D'}[freq[-1]]
+
+def make_bars(n, freq, seed):
+	import numpy as np
+	import pandas as pd 
+
+	rng = np.random.default_rng(seed)
+	index = pd.date_range(end = pd.Timestamp(END_TS), periods = n, 
+		freq = freq_offset(freq), name = 'ts')
+
+	close = 100*np.exp(np.cumsum(rng.normal(0, 2e-3, n)))
+	open_ = np.r_[close[0], close[:-1]]
+	high = np.maximum(open_, close)*(1 + rng.random(n)*2e-3)
+	low = np.minimum(open_, close)*(1 - rng.random(n)*2e-3)
+	volume = rng.random(n)*100
+
+	return pd.DataFrame({'open': open_, 'high': high, 'low': low, 
+		'close': close, 'volume': volume}, index = index)
+
+def write_data(scenarios):
+	# one store per symbol / freq covering the longest scenario
+	import pandas as pd 
+	from twsq.paths import DATA_PATH
+	from twsq.data.bar_store import BarStore
+
+	store = BarStore(os.path.join(DATA_PATH, 'Binance'))
+	need = {}
+	for _, _, freq, n_symbols, days, _ in scenarios:
+		n, d = need.get(freq, (0, 0))
+		need[freq] = (max(n, n_symbols), max(d, days))
+
+	for freq, (n_symbols, days) in need.items():
+		n_bars = int(pd.Timedelta(days + WARMUP_DAYS, 'D') 
+			/ pd.Timedelta(freq_offset(freq))) + 1
+
+		for i, symbol in enumerate(symbols(n_symbols)):
+			if not store.exists(symbol, freq):
+				store.append(make_bars(n_bars, freq, i), symbol, freq)
+
+def run_scenario(scenario):
+	import pandas as pd 
+	import strategies
+
+	name, strategy, freq, n_symbols, days, params = scenario
+	Alpha = getattr(strategies, strategy)
+
+	end_ts = pd.Timestamp(END_TS)
+	start_ts = end_ts - pd.Timedelta(days, 'D')
+
+	t0 = perf_counter()
+	alpha = Alpha.run_backtest(start_ts, end_ts, freq = freq, name = name,
+		symbols = symbols(n_symbols), **params)
+	seconds = perf_counter() - t0
+
+	n_bars = len(alpha.pos_pnl)
+	orders = alpha.orders
+	n_orders = len(orders)
+	n_fills = int((orders['status'] == 'closed').sum()) if n_orders else 0
+
+	timings = alpha.get_timings()
+
+	return {
+		'scenario': name,
+		'strategy': strategy,
+		'freq': freq,
+		'symbols': n_symbols,
+		'days': days,
+		'bars': n_bars,
+		'orders': n_orders,
+		'fills': n_fills,
+		'seconds': seconds,
+		'bars_per_sec': n_bars/seconds,
+		'orders_per_sec': n_orders/seconds,
+		'peak_rss_mb': peak_rss_mb(),
+		'phases_s': timings['total_s'].to_dict(),
+		}
+
+def peak_rss_mb():
+	try:
+		import resource
+	except ImportError:
+		return None
+
+	rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# kilobytes on linux, bytes on mac
+	if sys.platform == 'darwin':
+		rss /= 1024
+	return rss/1024
+
+def child(args):
+	scenario = [x for x in get_scenarios(args) if x[0] == args.scenario[0]][0]
+	result = run_scenario(scenario)
+	with open(args.result, 'w') as handle:
+		json.dump(result, handle)
+
+def get_scenarios(args):
+	scenarios = SCENARIOS
+	if args.scenario:
+		scenarios = [x for x in scenarios if x[0] in args.scenario]
+
+	if args.quick:
+		scenarios = [x[:4] + (max(1, x[4]//10),) + x[5:] for x in scenarios]
+
+	return scenarios
+
+def main(args):
+	scenarios = get_scenarios(args)
+	if not len(scenarios):
+		raise ValueError(f'Unknown scenario(s): {args.scenario}')
+
+	write_data(scenarios)
+
+	results = []
+	for scenario in scenarios:
+		name = scenario[0]
+		print(f'Running {name}...', file = sys.stderr)
+
+		result = os.path.join(os.environ['TWSQROOT'], f'{name}.json')
+		cmd = [sys.executable, os.path.abspath(__file__), '--child', 
+			'--result', result, '--scenario', name]
+		if args.quick:
+			cmd.append('--quick')
+
+		# the child's progress line goes to stdout
+		proc = subprocess.run(cmd, stdout = subprocess.DEVNULL)
+		if proc.returncode:
+			results.append({'scenario': name, 'error': proc.returncode})
+			continue
+
+		with open(result) as handle:
+			results.append(json.load(handle))
+
+		res = results[-1]
+		print(f'  {res["bars_per_sec"]:,.0f} bars/s, '
+			f'{res["orders_per_sec"]:,.0f} orders/s, '
+			f'{res["peak_rss_mb"]:,.0f} MB', file = sys.stderr)
+
+	report = {
+		'meta': {
+			'ts': datetime.utcnow().isoformat(),
+			'python': platform.python_version(),
+			'platform': platform.platform(),
+			'quick': args.quick,
+			},
+		'results': results,
+		}
+
+	out = json.dumps(report, indent = 2)
+	if args.out:
+		with open(args.out, 'w') as handle:
+			handle.write(out)
+	else:
+		print(out)
+
+def parse_args():
+	parser = argparse.ArgumentParser(description = __doc__.strip().split('\n')[0])
+	parser.add_argument('--out', help = 'write JSON results here instead of stdout')
+	parser.add_argument('--quick', action = 'store_true', 
+		help = 'run every scenario over a tenth of the days')
+	parser.add_argument('--scenario', action = 'append', 
+		help = 'only run this scenario. can be repeated')
+	parser.add_argument('--root', help = 'TWSQROOT to use. default is a temporary directory')
+	parser.add_argument('--child', action = 'store_true', help = argparse.SUPPRESS)
+	parser.add_argument('--result', help = argparse.SUPPRESS)
+	return parser.parse_args()
+
+if __name__ == '__main__':
+	args = parse_args()
+
+	if args.child:
+		# TWSQROOT is inherited from the parent
+		sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+		child(args)
+
+	else:
+		root = args.root or tempfile.mkdtemp(prefix = 'twsq_bench_')
+		os.environ['TWSQROOT'] = root
+
+		# must be set before twsq is imported
+		with open(os.path.join(root, 'settings.yml'), 'w') as handle:
+			handle.write('data:\n  offline: true\n')
+
+		sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+		try:
+			main(args)
+		finally:
+			if args.root is None:
+				shutil.rmtree(root, ignore_errors = True)
@@ -0,0 +1,101 @@
+"""
+Reference strategies for the backtest benchmarks. 
+
+Symbols are passed in as a parameter so the same strategy can be run 
+on any universe size.
+"""
+from twsq.alpha import Alpha
+import pandas as pd 
+
+class TargetRebalance(Alpha):
+	"""Momentum long / short, rebalanced to target every bar"""
+
+	def prepare(self, symbols, lookback=24, notional=1000):
+		self.symbols = symbols
+		self.universe = symbols
+		self.lookback = lookback
+		self.notional = notional
+
+	def rebalance(self):
+		target = {}
+		for symbol in self.symbols:
+			bars = self.get_lastn_bars(symbol, self.lookback, self.freq)
+			if len(bars) < 2:
+				continue
+
+			close = bars['close'].values
+			side = 1 if close[-1] > close[0] else -1
+			target[symbol.split('/')[0]] = side*self.notional/close[-1]
+
+		self.trade_to_target(target, quote = 'USDT', route = True)
+
+	def target_positions(self, bars):
+		# same targets as rebalance when no bars are missing
+		close = bars['close'][self.symbols]
+		first = close.shift(self.lookback - 1)
+		side = (close > first).astype(float)*2 - 1
+
+		target = (side*self.notional/close).where(first.notna())
+		target.columns = [x.split('/')[0] for x in self.symbols]
+		return target
+
+class LimitLadder(Alpha):
+	"""Re-quotes a ladder of resting limit orders around the price every bar"""
+
+	def prepare(self, symbols, levels=5, width=0.002, qty=1):
+		self.symbols = symbols
+		self.levels = levels
+		self.width = width
+		self.qty = qty
+
+	def rebalance(self):
+		self.cancel_all_orders()
+		pos = self.get_pos()
+
+		for symbol in self.symbols:
+			price = self.get_current_price(symbol)
+			held = pos.get(symbol.split('/')[0], 0)
+
+			for k in range(1, self.levels+1):
+				self.create_order(symbol, self.qty, 'buy', 
+					limit_price = price*(1-self.width*k))
+
+				if held > 0:
+					self.create_order(symbol, min(held, self.qty), 'sell', 
+						limit_price = price*(1+self.width*k))
+
+		self.route()
+
+class DailyQuotes(Alpha):
+	"""
+	Quotes resting limit orders once a day and re-quotes fills. 
+	With skip=True rebalance returns the next day, so the backtest 
+	only stops on bars that fill an order.
+	"""
+
+	def prepare(self, symbols, width=0.01, qty=1, skip=True):
+		self.symbols = symbols
+		self.width = width
+		self.qty = qty
+		self.skip = skip
+
+	def rebalance(self):
+		if self.ts.hour == 0:
+			self.cancel_all_orders()
+			for symbol in self.symbols:
+				price = self.get_current_price(symbol)
+				self.create_order(symbol, self.qty, 'buy', 
+					limit_price = price*(1-self.width))
+				self.create_order(symbol, self.qty, 'sell', 
+					limit_price = price*(1+self.width))
+			self.route()
+
+		if self.skip:
+			return self.ts.floor('D') + pd.Timedelta(1, 'D')
+
+	def on_finished_order(self, order):
+		if order.type == 'limit':
+			# quote again further away on the same side
+			mult = 1 - self.width if order.side == 'buy' else 1 + self.width
+			self.create_order(order.symbol, self.qty, order.side, 
+				limit_price = order.avg_px*mult, route = True)
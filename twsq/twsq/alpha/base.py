@@ -9,12 +9,20 @@ from functools import lru_cache
 from twsq.utils import ts_utils, Emojis
 from threading import Thread, Event
 from time import sleep 
-from twsq.utils import set_logging
-from twsq.exec import BacktestBinance, BacktestRunner, Runner 
+from twsq.utils import set_logging, PhaseTimer
+from .indicators import INDICATORS
+from twsq.exec import BacktestBinance, BacktestRunner, VectorizedBacktestRunner, Runner, Ledger, ResultsWriter, RunRegistry, \
+	run_sweep, run_walk_forward, run_monte_carlo
 import os
 
 class Alpha:
 
+	# symbols and extra bar frequencies the strategy reads. Set them as 
+	# class attributes or in prepare to load all data before a backtest starts.
+	# the defaults are tuples so no subclass can append to a shared list
+	universe = ()
+	universe_freqs = ()
+
 	def __init__(self, broker,  name = None, freq='1h', **kwargs):
 		"""
 		Alpha parent class used for making all strategies.
@@ -47,6 +55,23 @@ class Alpha:
 		self.custom_params = kwargs
 		self.broker.alphas[self.name]=self
 		self.freq = freq
+		self.timer = PhaseTimer()
+
+		# streams results to disk while running. set in _prepare
+		self.writer = None
+
+		# id in the run registry of the last saved backtest
+		self.run_id = None
+
+		# name > (func, history) for get_indicator
+		self._indicators = {x: (y, None) for x, y in INDICATORS.items()}
+
+	def __getstate__(self):
+		# results are rebuilt from the ledger and blotter in _finish
+		state = self.__dict__.copy()
+		state.pop('orders', None)
+		state.pop('pos_pnl', None)
+		return state
 
 	@property
 	def is_backtesting(self):
@@ -54,21 +79,39 @@ class Alpha:
 
 	@property
 	def open_orders(self):
-		open_orders = [x for x in self.broker._orders if x.strategy == self.name]
-		return open_orders
+		return self.broker.get_open_orders(self.name)
 
 	def get_open_orders(self):
-		open_orders = [x for x in self.broker._orders if x.strategy == self.name]
-		return open_orders
+		return self.broker.get_open_orders(self.name)
 		
 	def manage_open_orders(self):
 		return
 		
-	def _prepare(self):
+	def _prepare(self, save=True):
 		# move this stuff to initialize on run later
+		if save:
+			self.writer = ResultsWriter(self._results_path())
+			if self.is_backtesting:
+				# each backtest replaces the previous one
+				self.writer.clear()
+
 		self.load_pos()
 		self.prepare(**self.custom_params)
+
+	def _results_path(self):
+		if self.is_backtesting:
+			return safe_path(ALPHA_PATH, self.name, 'backtest')
+
+		return safe_path(ALPHA_PATH, self.name, 'live_trading', 
+			self.broker.name)
 		
+	def _prefetch(self, start_ts, end_ts):
+		if len(self.universe):
+			freqs = set(self.universe_freqs)
+			freqs.add(self.freq)
+			self.broker.pricing.prefetch(self.universe, sorted(freqs), 
+				start_ts, end_ts)
+
 	def prepare(self):
 		"""
 		Function users can fill out to set custom parameters
@@ -81,19 +124,36 @@ class Alpha:
 		"""current timestamp"""
 		return self.broker.ts
 
+	def get_timings(self):
+		"""
+		Time spent in each phase of the run loop. 
+
+		Returns
+		-------
+		DataFrame
+		Indexed by phase (fill_orders, manage_open_orders, rebalance, 
+		fill_market, snap_port) with number of calls, total seconds, 
+		mean microseconds per call and percent of the timed total
+		"""
+		return self.timer.report()
+
 	def get_port_val(self):
-		return self.broker.port_val[self.name]
+		series = self.broker.get_ledger(self.name).port_val_series()
 
-	def _finish(self):
+		if (self.writer is not None) and len(self.writer.session['pos_pnl']):
+			# the first ledger row is the last one already written
+			written = self.writer.read('pos_pnl', session=True)
+			written = written.set_index('Date')['port_val']
+			series = pd.concat([written, series.iloc[1:]])
 
+		return series
 
-		if self.is_backtesting:
-			path = safe_path(ALPHA_PATH, self.name, 'backtest')
+	def _finish(self, save=True):
 
-		else:
-			path = safe_path(ALPHA_PATH, self.name, 'live_trading', 
-				self.broker.name)
 
+		path = self._results_path() if save else None
+
+		if not self.is_backtesting:
 			self.logging(f'{Emojis.exit} Exiting trader...')
 			pnl = self.snap_pnl(verbose=False)
 			self.logging(f'{Emojis.pnl} Final session PnL %.2f'% pnl)
@@ -102,9 +162,16 @@ class Alpha:
 			if len(self.get_open_orders()):
 				sleep(7) # process any final order updates
 
+		if self.writer is not None:
+			# live sessions keep orders still open at exit
+			self.writer.flush(self.broker, self.name, final=True, 
+				open_orders=not self.is_backtesting)
+
 		self.orders  = self.save_orders(path)
 		self.pos_pnl = self.save_pos_pnl(path)
-		self.pos_pnl = self.pos_pnl.set_index('Date')
+
+		if self.pos_pnl is not None:
+			self.pos_pnl = self.pos_pnl.set_index('Date')
 
 		if not self.is_backtesting:
 			pos_str = self.get_pos_string()
@@ -115,61 +182,53 @@ class Alpha:
 	# 	return self.broker.pricing.get_bars(symbol, start_ts, end_ts)
 
 	def save_pos_pnl(self,path):
+		# path=None builds the frame without saving it. backtests are 
+		# also saved to csv, live sessions only stream to the writer
 		
-		filepath = os.path.join(path,'pos_pnl.csv')
-
-		val = self.broker.port_val.get(self.name)
-		
-		if val is not None:
-			pnl = val.diff().fillna(0)
-			df = pd.DataFrame({'port_val':val,'pnl':pnl}).sort_index()
-			hist_pos = pd.DataFrame(self.broker.hist_pos[self.name]).T.fillna(0).sort_index()
-			df = pd.concat([df,hist_pos],axis=1)			
-			df = df.reset_index()#.sort_index()
-
-			df = df.rename(columns = {'index':'Date'})
-			df = df.iloc[1:]
+		if self.writer is not None:
+			df = self.writer.read('pos_pnl', session = not self.is_backtesting)
+			# assets first held in later chunks
+			df = df.fillna(0)
 
-			if not df.empty:
-				if not self.is_backtesting and os.path.exists(filepath):
-					current = pd.read_csv(filepath)
-					if not current.empty:
-						current['Date'] = pd.DatetimeIndex(current['Date'])
-						df = pd.concat([current,df],axis=0,ignore_index=True)
+		else:
+			ledger = self.broker.ledgers.get(self.name)
+			if ledger is None:
+				return
 
-				df.to_csv(filepath,index=False)
-				return df
+			df = ledger.to_frame()
+			df = df.iloc[1:]
 
+		if not df.empty:
+			if (path is not None) and self.is_backtesting:
+				df.to_csv(os.path.join(path,'pos_pnl.csv'),index=False)
+			return df
 
 	def save_hist_pos(self,path):
-		df = pd.DataFrame(self.broker.hist_pos).T.fillna(0)
+		df = self.broker.get_ledger(self.name).pos_frame()
 		df.index.name = 'Date'
 		df = df.reset_index()
 		df.to_csv(os.path.join(path,'pos.csv'),index=False)
 
 	def save_orders(self,path):
-		filepath = os.path.join(path,'orders.csv')
+		# path=None builds the frame without saving it. backtests are 
+		# also saved to csv, live sessions only stream to the writer
 
-		orders_df = []
-		for order in self.broker.all_orders:
-			if order.strategy == self.name:
-				orders_df.append(order.__dict__)
-		orders_df = pd.DataFrame(orders_df)
+		if self.writer is not None:
+			frames = [self.writer.read('orders', session = not self.is_backtesting)]
+			if self.is_backtesting:
+				# open orders first, as in get_orders_frame
+				frames.insert(0, self.broker.get_orders_frame(self.name))
 
-		if not orders_df.empty:
-			if not self.is_backtesting and os.path.exists(filepath):
-				current = pd.read_csv(filepath)
-				if not current.empty:
+			frames = [x for x in frames if not x.empty]
+			orders_df = pd.concat(frames, axis=0, ignore_index=True) \
+				if len(frames) else pd.DataFrame()
 
-					if 'start_ts' in current:
-						current['start_ts']=pd.DatetimeIndex(current['start_ts'])
-					
-					if 'end_ts' in current:
-						current['end_ts']=pd.DatetimeIndex(current['end_ts'])
+		else:
+			orders_df = self.broker.get_orders_frame(self.name)
 
-					orders_df = pd.concat([current,orders_df],axis=0,
-						ignore_index=True)
-			orders_df.to_csv(filepath, index=False)
+		if not orders_df.empty:
+			if (path is not None) and self.is_backtesting:
+				orders_df.to_csv(os.path.join(path,'orders.csv'), index=False)
 			return orders_df 
 
 	def on_exit(self):
@@ -372,27 +431,27 @@ class Alpha:
 		start_port_val = 0
 
 		if not self.broker.is_backtesting:
-			path = safe_path(ALPHA_PATH, self.name, 'live_trading', 
-				self.broker.name)
+			last = None
+			if self.writer is not None:
+				last = self.writer.last_row('pos_pnl')
 
-			filepath = os.path.join(path,'pos_pnl.csv')
-		
-			if os.path.exists(filepath):
-				pos_pnl = pd.read_csv(filepath)
-
-				if not pos_pnl.empty:
-
-					pos_pnl['Date'] = pd.DatetimeIndex(pos_pnl['Date'])
-					dt = pos_pnl['Date'].iloc[-1]
+			if last is None:
+				# results saved before they were streamed in chunks
+				filepath = os.path.join(self._results_path(),'pos_pnl.csv')
+			
+				if os.path.exists(filepath):
+					pos_pnl = pd.read_csv(filepath)
+					if not pos_pnl.empty:
+						last = pos_pnl.iloc[-1]
 
-					self.logging('Loading starting pos from %s' 
-					% dt.strftime('%d-%b-%y %H:%M:%S'),level='debug')
+			if last is not None:
+				ts = pd.to_datetime(last['Date'])
 
-					start_pos =  pos_pnl.drop(['Date','port_val','pnl'],axis=1)
-					start_pos = start_pos.iloc[-1].to_dict()
+				self.logging('Loading starting pos from %s' 
+				% ts.strftime('%d-%b-%y %H:%M:%S'),level='debug')
 
-					ts = pd.to_datetime(pos_pnl['Date'].values[-1])
-					start_port_val = pos_pnl['port_val'].iloc[-1]
+				start_pos = last.drop(['Date','port_val','pnl']).to_dict()
+				start_port_val = last['port_val']
 					
 		self.broker.pos[self.name] = start_pos.copy()
 		
@@ -400,13 +459,9 @@ class Alpha:
 			pos_str = self.get_pos_string()
 			self.logging(f'Initial positions: {pos_str}',level='info')
 
-		hist_pos = {}
-		hist_pos[ts] = start_pos.copy()
-		self.broker.hist_pos[self.name] = hist_pos
-
-		port_val = pd.Series()
-		port_val[ts] = start_port_val
-		self.broker.port_val[self.name] = port_val
+		ledger = Ledger()
+		ledger.append(ts, start_pos, start_port_val)
+		self.broker.ledgers[self.name] = ledger
 
 	def wait_till_ready(self):
 		self.logging('Waiting till feeds ready',level='debug')
@@ -414,6 +469,8 @@ class Alpha:
 
 	def snap_port(self):
 		self.broker.snap_port(self.name)
+		if self.writer is not None:
+			self.writer.flush(self.broker, self.name)
 
 	def get_current_price(self, symbol):
 		"""
@@ -458,9 +515,102 @@ class Alpha:
 		DataFrame 
 		columns = ['open','high','low','close','volume']
 		index = Bar open times
+
+		In backtests the returned frame is a read-only view on the 
+		memory-mapped bar store. Use .copy() before modifying it in place.
 		"""
 		return self.broker.pricing.get_lastn_bars(symbol, n, freq, lag)
 
+	def get_lastn_panel(self, symbols, n, freq, field='close', lag=0):
+		"""
+		Get the last n bars (of size freq) of one field for many symbols.
+
+		Parameters
+		----------
+		symbols : list of str
+			Security symbols (IE. ['ETH/USD', 'BTC/USD'])
+		n :  int
+			Number of bars to pull. In live trading, you can
+			only look back 720 bars.
+		freq : {'1m', '5m','15m', '30m', '1h', '4h', '1d'}
+			Frequency (size) of the bars.
+		field : {'open', 'high', 'low', 'close', 'volume'}, optional
+			Bar field to pull. Default is close.
+		lag : int, optional
+			Whether to lag the bars, as in get_lastn_bars.
+
+		Returns
+		-------
+		DataFrame 
+		columns = symbols
+		index = n bar open times, one every freq. 
+		Bars a symbol does not have are nan.
+		"""
+		return self.broker.pricing.get_lastn_panel(symbols, n, freq, field, lag)
+
+	def register_indicator(self, name, func, history=None):
+		"""
+		Add a custom indicator for get_indicator.
+
+		Parameters
+		----------
+		name : str
+			Name to pass to get_indicator
+		func : function
+			func(bars, **params) taking a bar frame and returning a 
+			series or array of the same length. Values may only depend 
+			on the bar itself and earlier bars. Define it at module 
+			level for backtest checkpoints to work.
+		history : int, optional
+			Bars func needs in live trading. Defaults to 720.
+		"""
+		self._indicators[name] = (func, history)
+
+	def get_indicator(self, symbol, name, freq=None, lag=0, **params):
+		"""
+		Get the current value of an indicator for a symbol.
+
+		In backtests the indicator is computed once over all bars and 
+		each call reads the value of the last completed bar, so calls 
+		cost the same whatever the window. In live trading it is 
+		recomputed over recent bars once per new bar.
+
+		Parameters
+		----------
+		symbol : str
+			Security symbol (IE. 'ETH/USD')
+		name : {'sma', 'ema', 'std', 'atr', 'zscore'} or str
+			Indicator to get, or one added with register_indicator.
+			sma = simple moving average (window, field='close')
+			ema = exponential moving average (span, field='close')
+			std = rolling standard deviation (window, field='close')
+			atr = average true range (window)
+			zscore = (field - sma) / std (window, field='close')
+		freq : {'1m', '5m','15m', '30m', '1h', '4h', '1d'}, optional
+			Frequency (size) of the bars. Defaults to the strategy freq.
+		lag : int, optional
+			Value lag bars before the last completed bar.
+
+		Indicator parameters (IE. window=20) are passed through **params. 
+		They key the cache, so values must be hashable. Lists are 
+		converted to tuples.
+
+		Returns
+		-------
+		float
+			Indicator value, nan if there are not enough bars
+		"""
+
+		if freq is None:
+			freq = self.freq
+
+		func, history = self._indicators[name]
+		key = (name,) + tuple(sorted((x, tuple(y) if isinstance(y, list) else y) 
+			for x, y in params.items()))
+
+		return self.broker.pricing.get_indicator(symbol, freq, key, 
+			lambda bars: func(bars, **params), history, lag)
+
 	def on_finished_order(self,order):
 		"""
 		React to a finished order immediately.
@@ -472,15 +622,49 @@ class Alpha:
 		"""
 
 	def rebalance(self):
+		"""
+		Function users fill out with the strategy's logic. Runs 
+		every freq.
+
+		In backtests it can return a timestamp to say it has nothing 
+		to do until then. Bars before it are skipped, except for bars 
+		a resting limit order fills on, and valued at once, so sparse 
+		strategies backtest in time proportional to their activity.
+		"""
 		pass
 
+	def target_positions(self, bars):
+		"""
+		Function users can fill out to backtest with 
+		run_backtest(vectorized=True) instead of running rebalance 
+		every bar. Only for strategies that trade to target 
+		positions depending on past bars.
+
+		Parameters
+		----------
+		bars : DataFrame
+			Bars of Alpha.universe from 720 bars before the backtest 
+			start, with (field, symbol) columns, IE. bars['close'], 
+			indexed by the rebalance time the bar ends at. Missing 
+			bars are nan.
+
+		Returns
+		-------
+		DataFrame
+		Target positions as would be passed to trade_to_target at 
+		each rebalance time, with one column per asset (IE. 'ETH'). 
+		Rows in the index of bars. nan keeps the current position.
+		A row may only use bars up to its own time.
+		"""
+		raise NotImplementedError
+
 	# def get_pnl(self):
 	# 	self.broker.get_pnl(self.name)
 
 	def snap_pnl(self,verbose=True):
 		self.snap_port()
-		port_val = self.get_port_val()
-		pnl = port_val.iloc[-1] - port_val.iloc[0]
+		ledger = self.broker.get_ledger(self.name)
+		pnl = ledger.last_port_val - ledger.first_port_val
 		if verbose:
 			self.logging(f'{Emojis.pnl} Total session PnL %.2f'% pnl)
 		return pnl 
@@ -500,7 +684,7 @@ class Alpha:
 	@classmethod
 	def run_backtest(cls, start_ts = None, end_ts = None,
 			freq='1h',name=None, taker_fee=None,maker_fee=None,slip=None,
-			**kwargs):
+			checkpoint=False, show_timings=False, vectorized=False, fast=False, **kwargs):
 
 		"""
 		Run a backtest on Alpha
@@ -528,6 +712,19 @@ class Alpha:
 			per dollar traded.
 		slip : float, optional
 			Slippage for market orders. Will default to 10 bps per dollar traded.
+		checkpoint : bool, optional
+			Save the final backtest state so it can be continued over 
+			new bars with extend_backtest. Default is False.
+		show_timings : bool, optional
+			Show the share of time spent in each phase of the backtest 
+			loop in the progress line. See get_timings. Default is False.
+		vectorized : bool, optional
+			Compute the whole backtest at once from target_positions 
+			instead of calling rebalance every bar. Default is False.
+		fast : bool, optional
+			Value the portfolio once at the end from the fills instead 
+			of every bar. Faster, but get_port_val and snap_pnl are not 
+			up to date during the backtest. Default is False.
 
 		Optional custom strategy parameters can be passed through **kwargs
 
@@ -543,10 +740,270 @@ class Alpha:
 		alpha = cls(broker,name = name,freq = freq,**kwargs)
 
 		set_logging(debug=False)
-		runner = BacktestRunner(alpha,start_ts,end_ts)
+		if vectorized:
+			runner = VectorizedBacktestRunner(alpha,start_ts,end_ts)
+		else:
+			runner = BacktestRunner(alpha,start_ts,end_ts,show_timings=show_timings,
+				fast=fast)
 		runner.run()
+
+		if checkpoint and (runner.error is None):
+			runner.checkpoint(alpha._checkpoint_path(alpha.name))
+
 		return alpha
 
+	@classmethod
+	def get_runs(cls, query = None, **equals):
+
+		"""
+		Saved backtests of this strategy from the run registry
+
+		Every backtest run with run_backtest is registered with its 
+		parameters, data range, fees, a hash of the strategy code and 
+		its summary metrics. Alpha.run_id is the id of the last one.
+
+		Parameters
+		----------
+		query : str or callable, optional
+			pandas query string to filter runs, IE. 
+			'sharpe > 1 and `params.lookback` == 10', or a function 
+			of the runs frame returning a boolean mask.
+
+		Other columns to match exactly can be passed through **equals, 
+		IE. get_runs(freq='1h')
+
+		Returns
+		-------
+		DataFrame
+		One row per run. Use load_run to load a run's results
+		"""
+		return RunRegistry().runs(query, alpha = cls.__name__, **equals)
+
+	@staticmethod
+	def load_run(run_id, kind = 'pos_pnl', columns = None):
+
+		"""
+		Load results of a registered backtest
+
+		Parameters
+		----------
+		run_id : str
+			id of the run, IE. from get_runs or Alpha.run_id
+		kind : {'pos_pnl', 'orders'}, optional
+			Which results to load. Default is pos_pnl.
+		columns : list of str, optional
+			Only read these columns, IE. ['port_val']. Results are 
+			stored by column, so this skips reading the others.
+
+		Returns
+		-------
+		DataFrame
+		"""
+		return RunRegistry().load(run_id, kind, columns)
+
+	@staticmethod
+	def _checkpoint_path(name):
+		return os.path.join(safe_path(ALPHA_PATH, name, 'backtest'), 
+			'checkpoint.pk')
+
+	@classmethod
+	def extend_backtest(cls, end_ts = None, name = None):
+
+		"""
+		Continue a backtest saved with run_backtest(checkpoint=True) 
+		over bars after its end time. Positions, open orders, pnl 
+		history and strategy attributes are restored from the checkpoint, 
+		so only the new bars are run and the results match a full 
+		backtest over the whole period. The checkpoint is then updated.
+
+		Parameters
+		----------
+		end_ts : str, datetime or pandas timestamp, optional
+			new end time of backtest. default is current time.
+		name :  str, optional
+			Name the strategy was run under. Will default to the 
+			name of the class.
+
+		Returns
+		-------
+		Alpha
+		Your instantiated strategy (Alpha sub-class)
+		Use Alpha.pos_pnl to see backtest positions and pnl
+		Use Alpha.orders to see all backtest orders 
+		"""
+
+		if name is None:
+			name = cls.__name__
+
+		path = cls._checkpoint_path(name)
+		if not os.path.exists(path):
+			raise Exception(f'No backtest checkpoint for {name}. '
+				'Run run_backtest with checkpoint=True first.')
+
+		set_logging(debug=False)
+		runner = BacktestRunner.load(path)
+		runner.extend(end_ts)
+		runner.run()
+
+		if runner.error is None:
+			runner.checkpoint(path)
+
+		return runner.alpha
+
+	@classmethod
+	def run_sweep(cls, grid, start_ts = None, end_ts = None,
+			freq='1h', taker_fee=None, maker_fee=None, slip=None,
+			processes=None, **kwargs):
+
+		"""
+		Run backtests on Alpha for a grid of parameters in parallel
+
+		Bars for the universe class attribute are loaded once up front 
+		and shared by the worker processes, which only read them. The 
+		universe must list every symbol the strategy trades. When end_ts 
+		is not given, it is fixed once so every config covers the same bars.
+
+		Parameters
+		----------
+		grid : dict of lists or list of dicts
+			Parameters to sweep. A dict runs every combination, 
+			IE. {'lookback': [10, 20], 'slip': [0, 1e-3]} runs 4 backtests. 
+			Keys can be custom strategy parameters or freq, taker_fee, 
+			maker_fee and slip.
+		start_ts : str, datetime or pandas timestamp, optional
+			start time of backtests. default is 365 days prior to end_ts
+		end_ts : str, datetime or pandas timestamp, optional
+			end time of backtests. default is current time.
+		freq : {'1m', '5m','15m', '30m', '1h', '4h', '1d'}, optional
+			Rebalance frequency for configs that do not set one.
+		taker_fee, maker_fee, slip : float, optional
+			Defaults for configs that do not set them. See run_backtest.
+		processes : int, optional
+			Number of worker processes. Defaults to the number of cores.
+
+		Optional custom strategy parameters shared by every config 
+		can be passed through **kwargs
+
+		Returns
+		-------
+		DataFrame
+		One row per config with its parameters and summary metrics 
+		(total_pnl, sharpe, max_drawdown, turnover, fees, n_orders, n_fills)
+		"""
+
+		set_logging(debug=False)
+		return run_sweep(cls, grid, start_ts, end_ts, processes = processes,
+			freq = freq, taker_fee = taker_fee, maker_fee = maker_fee, 
+			slip = slip, **kwargs)
+
+	@classmethod
+	def run_walk_forward(cls, grid, start_ts, end_ts, train, test, step=None,
+			metric='sharpe', minimize=False, freq='1h', taker_fee=None, 
+			maker_fee=None, slip=None, processes=None, **kwargs):
+
+		"""
+		Walk-forward optimization of Alpha
+
+		[start_ts, end_ts] is split into rolling train / test windows. 
+		For each window every config in grid is backtested on the train 
+		period and the best one by metric is then backtested on the test 
+		period that follows. Windows run in parallel on bars loaded once, 
+		so the universe class attribute must list every symbol traded.
+
+		Parameters
+		----------
+		grid : dict of lists or list of dicts
+			Parameters to search. See run_sweep.
+		start_ts : str, datetime or pandas timestamp
+			start of the first train window
+		end_ts : str, datetime or pandas timestamp
+			no test window runs past end_ts
+		train : str or Timedelta
+			Length of each train period, IE. '90D'
+		test : str or Timedelta
+			Length of each test period, IE. '30D'
+		step : str or Timedelta, optional
+			How far windows move forward. Defaults to test.
+		metric : str, optional
+			Summary metric used to pick the best config. One of total_pnl, 
+			sharpe, max_drawdown, turnover, fees, n_orders, n_fills.
+		minimize : bool, optional
+			Pick the config with the lowest metric instead of the highest.
+		freq, taker_fee, maker_fee, slip : optional
+			Defaults for configs that do not set them. See run_backtest.
+		processes : int, optional
+			Number of worker processes. Defaults to the number of cores.
+
+		Optional custom strategy parameters shared by every config 
+		can be passed through **kwargs
+
+		Returns
+		-------
+		DataFrame
+		One row per window with its dates, the chosen parameters, the 
+		train metric and the test summary metrics
+		"""
+
+		set_logging(debug=False)
+		return run_walk_forward(cls, grid, start_ts, end_ts, train, test, 
+			step = step, metric = metric, minimize = minimize, 
+			processes = processes, freq = freq, taker_fee = taker_fee, 
+			maker_fee = maker_fee, slip = slip, **kwargs)
+
+	@classmethod
+	def run_monte_carlo(cls, start_ts = None, end_ts = None, n_paths=100, 
+			block=24, fee_jitter=0, slip_jitter=0, freq='1h', taker_fee=None, 
+			maker_fee=None, slip=None, seed=None, processes=None, **kwargs):
+
+		"""
+		Backtest Alpha over many resampled price paths in parallel
+
+		Bars of every symbol in Alpha.universe inside the backtest range 
+		are replaced by a block bootstrap of their own returns, the same 
+		blocks for all symbols so their co-movement is kept. Fees and 
+		slippage can be perturbed per path as well. Bars before start_ts 
+		are left untouched. Paths are built in memory from the stored 
+		bars, which are loaded once and shared by the workers.
+
+		Parameters
+		----------
+		start_ts : str, datetime or pandas timestamp, optional
+			start time of backtest. default is 365 days prior to end_ts
+		end_ts : str, datetime or pandas timestamp, optional
+			end time of backtest. default is current time.
+		n_paths : int, optional
+			Number of paths to run. Default is 100.
+		block : int, optional
+			Length in bars of resampled blocks. Longer blocks keep more 
+			of the autocorrelation in returns. Default is 24.
+		fee_jitter : float, optional
+			Relative standard deviation of taker and maker fees across 
+			paths, IE. 0.2 for +-20%. Default is 0.
+		slip_jitter : float, optional
+			Relative standard deviation of slippage across paths. Default is 0.
+		freq, taker_fee, maker_fee, slip : optional
+			See run_backtest.
+		seed : int, optional
+			Seed for reproducible paths. Stored in results.attrs['seed'].
+		processes : int, optional
+			Number of worker processes. Defaults to the number of cores.
+
+		Optional custom strategy parameters can be passed through **kwargs
+
+		Returns
+		-------
+		DataFrame
+		One row per path with its fees and slippage and the summary 
+		metrics of twsq.analytics.summarize, IE. total_pnl, max_drawdown 
+		and turnover. Use .describe() to see their distribution.
+		"""
+
+		set_logging(debug=False)
+		return run_monte_carlo(cls, start_ts, end_ts, n_paths = n_paths, 
+			block = block, fee_jitter = fee_jitter, slip_jitter = slip_jitter, 
+			seed = seed, processes = processes, freq = freq, 
+			taker_fee = taker_fee, maker_fee = maker_fee, slip = slip, **kwargs)
+
 	@classmethod
 	def run_live(cls, freq='1h',name=None, **kwargs):
 
@@ -0,0 +1,39 @@
+"""
+Built-in indicators for Alpha.get_indicator.
+
+Each takes a bar frame (columns open, high, low, close, volume) and 
+returns a series aligned to it. Values may only depend on the bar 
+itself and earlier bars, since backtests compute them once over all 
+stored bars and then read the value of the last completed bar.
+"""
+
+import numpy as np
+
+def sma(bars, window, field='close'):
+	return bars[field].rolling(window).mean()
+
+def ema(bars, span, field='close'):
+	return bars[field].ewm(span=span, adjust=False).mean()
+
+def std(bars, window, field='close'):
+	return bars[field].rolling(window).std()
+
+def atr(bars, window):
+	# simple moving average of true range
+	prev = bars['close'].shift(1)
+	tr = np.maximum(bars['high'], prev) - np.minimum(bars['low'], prev)
+	tr = tr.fillna(bars['high'] - bars['low'])
+	return tr.rolling(window).mean()
+
+def zscore(bars, window, field='close'):
+	x = bars[field]
+	roll = x.rolling(window)
+	return (x - roll.mean()) / roll.std()
+
+INDICATORS = {
+	'sma': sma,
+	'ema': ema,
+	'std': std,
+	'atr': atr,
+	'zscore': zscore,
+	}
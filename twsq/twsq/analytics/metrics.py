@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd 
+
+def summarize(pos_pnl, orders = None):
+	"""
+	Summary statistics of a backtest.
+
+	Parameters
+	----------
+	pos_pnl : DataFrame
+		Positions and pnl indexed by Date, IE. Alpha.pos_pnl
+	orders : DataFrame, optional
+		Orders blotter, IE. Alpha.orders
+
+	Returns
+	-------
+	dict
+		total_pnl, sharpe (annualized pnl sharpe), max_drawdown, 
+		turnover (notional traded), fees, n_orders and n_fills
+	"""
+
+	res = {'total_pnl': 0.0, 'sharpe': np.nan, 'max_drawdown': 0.0, 
+		'turnover': 0.0, 'fees': 0.0, 'n_orders': 0, 'n_fills': 0}
+
+	if (pos_pnl is not None) and len(pos_pnl):
+		pnl = pos_pnl['pnl']
+		port_val = pos_pnl['port_val']
+
+		res['total_pnl'] = pnl.sum()
+		res['max_drawdown'] = (port_val.cummax() - port_val).max()
+
+		if len(pnl) > 1 and pnl.std() > 0:
+			bar = pd.Series(pos_pnl.index).diff().median()
+			bars_per_year = pd.Timedelta(days=365) / bar
+			res['sharpe'] = pnl.mean() / pnl.std() * np.sqrt(bars_per_year)
+
+	if (orders is not None) and len(orders):
+		res['turnover'] = orders['ntn_filled'].abs().sum()
+		res['fees'] = orders['fee'].sum()
+		res['n_orders'] = len(orders)
+		res['n_fills'] = int((orders['qty_filled'] > 0).sum())
+
+	return res
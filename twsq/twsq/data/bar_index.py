@@ -0,0 +1,75 @@
+import numpy as np
+
+class BarIndex:
+	"""
+	Integer-position index over one symbol / freq bar frame.
+
+	Bar open times are held as int64 unix nanos. Lookups keep a 
+	pointer to the last position found, so as a backtest clock 
+	moves forward each lookup advances the pointer instead of 
+	searching, and slices are taken with iloc rather than 
+	label-based datetime slicing.
+	"""
+
+	def __init__(self, data):
+		self.data = data 
+
+		if data.empty:
+			self.ts = np.empty(0, dtype=np.int64)
+		else:
+			self.ts = data.index.values.astype('datetime64[ns]').astype(np.int64)
+
+		self.pos = 0 
+		self.end_ts = None
+		self._columns = {}
+
+		# latest end_ts bars have been synced for
+		self.checked_ts = -1
+
+	def __len__(self):
+		return len(self.ts)
+
+	def column(self, field):
+		# numpy values of a column, looked up once
+		values = self._columns.get(field)
+		if values is None:
+			values = self.data[field].values
+			self._columns[field] = values
+		return values
+
+	@property
+	def last_ts(self):
+		if len(self.ts):
+			return self.ts[-1]
+		return -1
+
+	def locate(self, end_ts):
+		"""Number of bars with open time <= end_ts"""
+		ts = self.ts
+		pos = self.pos
+
+		if (self.end_ts is None) or (end_ts < self.end_ts):
+			pos = int(np.searchsorted(ts, end_ts, 'right'))
+
+		elif (pos < len(ts)) and (ts[pos] <= end_ts):
+			pos += 1
+			if (pos < len(ts)) and (ts[pos] <= end_ts):
+				# clock jumped more than one bar
+				pos += int(np.searchsorted(ts[pos:], end_ts, 'right'))
+
+		self.pos = pos
+		self.end_ts = end_ts
+		return pos
+
+	def slice(self, start_ts, end_ts, num_bars):
+		"""Positions (i, j) of bars with start_ts <= open time <= end_ts"""
+		j = self.locate(end_ts)
+		i = max(j - num_bars, 0)
+
+		if (i > 0) and (self.ts[i-1] >= start_ts):
+			# bars are not on a regular grid, fall back to searching
+			i = int(np.searchsorted(self.ts, start_ts, 'left'))
+		else:
+			i += int(np.searchsorted(self.ts[i:j], start_ts, 'left'))
+
+		return i, j
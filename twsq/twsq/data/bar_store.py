@@ -0,0 +1,226 @@
+import numpy as np
+import pandas as pd
+import logging
+import pickle
+import json
+import gzip
+import os
+
+COLUMNS = ['open','high','low','close','volume']
+
+class BarStore:
+	"""
+	Columnar, append-only on-disk store for OHLCV bars.
+
+	Each symbol / freq lives in its own directory holding one
+	flat little-endian file per column plus a small meta.json.
+	Timestamps are stored as absolute int64 unix nanos, so a
+	memory-mapped store gives the index as a view on the file.
+	Compressed stores keep them as delta-encoded int64 unix millis
+	(the first delta is the absolute timestamp), which gzip packs
+	far better. meta.json records which is used. New bars are
+	appended to the end of each column file in place, so a sync
+	only writes the new rows. meta.json is rewritten last and is
+	the commit point: bytes past the committed sizes are ignored
+	on read and truncated on the next append.
+
+	With compress=True columns are written as concatenated gzip
+	members, one per append. Compressed stores cannot be memory-mapped.
+	"""
+
+	dtypes = {'ts':'<i8','open':'<f8','high':'<f8',
+		'low':'<f8','close':'<f8','volume':'<f8'}
+
+	def __init__(self, path, compress=False):
+		self.path = path
+		self.compress = compress
+
+	def _dir(self, symbol, freq):
+		symbol = symbol.replace('/','_')
+		return os.path.join(self.path, f'BARS_{symbol}_{freq}')
+
+	def _col_path(self, dirpath, col, compress):
+		name = f'{col}.bin'
+		if compress:
+			name += '.gz'
+		return os.path.join(dirpath, name)
+
+	def exists(self, symbol, freq):
+		return os.path.exists(
+			os.path.join(self._dir(symbol, freq),'meta.json'))
+
+	def read_meta(self, symbol, freq):
+		path = os.path.join(self._dir(symbol, freq),'meta.json')
+		if not os.path.exists(path):
+			return None
+
+		with open(path,'r') as handle:
+			return json.load(handle)
+
+	def _write_meta(self, dirpath, meta):
+		path = os.path.join(dirpath,'meta.json')
+		tmp = path + '.tmp'
+		with open(tmp,'w') as handle:
+			json.dump(meta, handle)
+		os.replace(tmp, path)
+
+	@staticmethod
+	def _ts_format(meta):
+		# stores written before absolute timestamps are all delta
+		return meta.get('ts_format', 'delta_ms')
+
+	def _read_col(self, dirpath, col, meta, mmap=False):
+		dtype = np.dtype(self.dtypes[col])
+		rows = meta['rows']
+		path = self._col_path(dirpath, col, meta['compress'])
+
+		if meta['compress']:
+			with open(path,'rb') as handle:
+				buf = gzip.decompress(handle.read(meta['nbytes'][col]))
+			return np.frombuffer(buf, dtype=dtype, count=rows)
+
+		if rows == 0:
+			return np.empty(0, dtype=dtype)
+
+		if mmap:
+			return np.memmap(path, dtype=dtype, mode='r', shape=(rows,))
+
+		return np.fromfile(path, dtype=dtype, count=rows)
+
+	def read(self, symbol, freq, columns=None, mmap=False):
+		"""
+		Read bars into numpy arrays.
+
+		Returns a tuple (ts, cols) where ts is an int64 array of
+		unix nanos and cols maps column name to array, or None
+		if nothing is stored. With mmap=True both are views on
+		the column files where the store allows it.
+		"""
+		meta = self.read_meta(symbol, freq)
+		if meta is None:
+			return None
+
+		if columns is None:
+			columns = meta['columns']
+
+		dirpath = self._dir(symbol, freq)
+		if self._ts_format(meta) == 'ns':
+			ts = self._read_col(dirpath, 'ts', meta, mmap = mmap)
+		else:
+			deltas = self._read_col(dirpath, 'ts', meta)
+			ts = np.cumsum(deltas, dtype=np.int64)*1000000
+
+		cols = {}
+		for col in columns:
+			cols[col] = self._read_col(dirpath, col, meta, mmap = mmap)
+
+		return ts, cols
+
+	def load(self, symbol, freq, columns=None, mmap=False):
+		"""
+		Read bars as a DataFrame indexed by bar open time.
+
+		With mmap=True the columns of the returned frame are
+		read-only views on memory-mapped column files, so processes
+		reading the same store share one page-cached copy and slices
+		of the frame do not copy.
+		"""
+		res = self.read(symbol, freq, columns, mmap = mmap)
+		if res is None:
+			return pd.DataFrame()
+
+		ts, cols = res
+		index = pd.DatetimeIndex(ts.view('datetime64[ns]'), name='ts', 
+			copy=False)
+		return pd.DataFrame(cols, index=index, copy=not mmap)
+
+	def append(self, data, symbol, freq):
+		"""
+		Append bars in data (DataFrame indexed by bar open time)
+		to the store. Bars at or before the last stored bar are dropped.
+		Returns the number of rows written.
+		"""
+		if data.empty:
+			return 0
+
+		dirpath = self._dir(symbol, freq)
+		meta = self.read_meta(symbol, freq)
+
+		if meta is None:
+			os.makedirs(dirpath, exist_ok=True)
+			meta = {'rows': 0, 'first_ts': None, 'last_ts': None,
+				'compress': self.compress, 'columns': list(COLUMNS),
+				'nbytes': {}, 
+				'ts_format': 'delta_ms' if self.compress else 'ns'}
+
+		ts = data.index.values.astype('datetime64[ms]').astype(np.int64)
+
+		if meta['last_ts'] is not None:
+			keep = ts > meta['last_ts']
+			data = data[keep]
+			ts = ts[keep]
+
+		if not len(ts):
+			return 0
+
+		if self._ts_format(meta) == 'ns':
+			arrays = {'ts': (ts*1000000).astype('<i8')}
+		else:
+			prev = meta['last_ts'] if meta['last_ts'] is not None else 0
+			arrays = {'ts': np.diff(ts, prepend=prev).astype('<i8')}
+
+		for col in meta['columns']:
+			arrays[col] = data[col].values.astype(self.dtypes[col])
+
+		for col, values in arrays.items():
+			self._append_col(dirpath, col, values, meta)
+
+		if meta['first_ts'] is None:
+			meta['first_ts'] = int(ts[0])
+		meta['last_ts'] = int(ts[-1])
+		meta['rows'] += len(ts)
+		self._write_meta(dirpath, meta)
+
+		return len(ts)
+
+	def _append_col(self, dirpath, col, values, meta):
+		path = self._col_path(dirpath, col, meta['compress'])
+		size = meta['nbytes'].get(col, 0)
+
+		with open(path,'ab') as handle:
+			if handle.tell() != size:
+				# drop anything written after the last commit
+				handle.truncate(size)
+				handle.seek(size)
+
+			if meta['compress']:
+				handle.write(gzip.compress(values.tobytes()))
+			else:
+				handle.write(values.tobytes())
+
+			meta['nbytes'][col] = handle.tell()
+
+	def delete(self, symbol, freq):
+		dirpath = self._dir(symbol, freq)
+		if not os.path.exists(dirpath):
+			return
+
+		for name in os.listdir(dirpath):
+			os.remove(os.path.join(dirpath, name))
+		os.rmdir(dirpath)
+
+	def migrate_pickle(self, path, symbol, freq, remove=False):
+		"""
+		One-shot import of a legacy PX_*.pk pickle into the store.
+		"""
+		with open(path, 'rb') as handle:
+			data = pickle.load(handle)
+
+		self.delete(symbol, freq)
+		rows = self.append(data.sort_index(), symbol, freq)
+		logging.debug(f'Migrated {rows} {symbol} {freq} bars from {path}')
+
+		if remove:
+			os.remove(path)
+
+		return rows
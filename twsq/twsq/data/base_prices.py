@@ -1,107 +1,190 @@
 from twsq.paths import DATA_PATH, safe_path
-from twsq.utils import ts_utils, print_pct_done
+from twsq.utils import ts_utils, print_pct_done, get_settings
 from twsq.api import get_api
+from .bar_store import BarStore
+from .resample import resample_bars
+from .bar_index import BarIndex
 from datetime import datetime
 import logging
 import pandas as pd 
-import pickle 
+import numpy as np
 import os 
-from threading import Event
+from glob import glob
+from threading import Event, Lock
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from time import time, sleep
 from functools import lru_cache
 
+FREQS = ['1m','5m','15m','30m','1h','4h','1d']
+
+# bars indicators are computed over outside fixed freq backtests
+INDICATOR_BARS = 720
+
 class BasePrices:
 
 	def __init__(self):
 
 		self.name = self.__class__.__name__.replace('Prices','')
 		self.path = safe_path(DATA_PATH, self.name)
-		self.api = get_api(self.name)
+
+		# offline backtests only read bars already in the store and 
+		# never connect to the exchange
+		self.offline = bool(get_settings('data','offline'))
+		self.api = None if self.offline else get_api(self.name)
+		self.store = BarStore(self.path, 
+			compress = bool(get_settings('data','compress')))
 		self.data = {}
+		self._indexes = {}
+
+		# per-bar snapshot of prices used during backtests
+		self._snapshot_ts = None
+		self._prices = {}
+		self._last_bars = {}
+
+		# indicator values: full series in backtests, last value live
+		self._indicators = {}
+
+		# memory-map stored bars instead of reading them into memory
+		self.mmap = False
+
+		# when set (IE. '1m') coarser bars are built from stored finer 
+		# bars instead of being downloaded separately
+		self.base_freq = get_settings('data','base_freq')
 
 		# need to wait for tick / bar connection to be online
 		# before requesting additional ticks
 		self._tick_socket_ready = Event()
 		self._bar_socket_ready = Event()
 
+		# concurrent bar downloads share one request throttle
+		self.download_workers = 8
+		self._fetch_lock = Lock()
+		self._next_fetch = 0
+
 	def _pickle_path(self, symbol, freq):
 		symbol = symbol.replace('/','_')
 		name = f'PX_{symbol}_{freq}.pk'
 		return os.path.join(self.path, name)
-		
 
-	def load_pickle(self, symbol, freq):
+	def migrate_pickles(self, remove=False):
+		"""
+		Import all legacy PX_*.pk pickle files into the bar store.
+		"""
+		for path in glob(os.path.join(self.path,'PX_*.pk')):
+			name = os.path.basename(path)[3:-3]
+			symbol, freq = name.rsplit('_',1)
+			self.store.migrate_pickle(path, symbol, freq, remove=remove)
+
+	def load_store(self, symbol, freq, columns=None):
 		name = '%s_%s' % (symbol, freq)
 
 		if name in self.data:
-			return self.data[name]
+			data = self.data[name]
+			if columns is not None:
+				data = data[columns]
+			return data
 
-		path = self._pickle_path(symbol, freq)
-		if os.path.exists(path):
-			with open(path, 'rb') as handle:
-				data = pickle.load(handle)
-				self.data[name] = data 
-				return data
-		return pd.DataFrame()
+		if not self.store.exists(symbol, freq):
+			path = self._pickle_path(symbol, freq)
+			if os.path.exists(path):
+				self.store.migrate_pickle(path, symbol, freq)
+
+		data = self.store.load(symbol, freq, columns, mmap = self.mmap)
+		if (columns is None) and not data.empty:
+			self.data[name] = data 
+		return data
 
-	def dump_pickle(self, data, symbol, freq):
+	def dump_store(self, data, symbol, freq):
+		# only bars past the last stored bar are written
 		if not data.empty:
-			path = self._pickle_path(symbol, freq)
-			with open(path, 'wb') as handle:
-			    pickle.dump(data, handle)
-			    name = '%s_%s' % (symbol, freq)
-			    self.data[name] = data 
+			self.store.append(data, symbol, freq)
+			name = '%s_%s' % (symbol, freq)
+
+			if self.mmap:
+				# remap on next access rather than holding a copy
+				self.data.pop(name, None)
+			else:
+				self.data[name] = data 
+
+	def _source_freq(self, symbol, freq):
+		# nearest finer stored freq that coarser bars can be built from
+		if (self.base_freq is None) or (freq == self.base_freq):
+			return 
+
+		step = ts_utils.freq_ns(freq)
+		base_step = ts_utils.freq_ns(self.base_freq)
+		if (step <= base_step) or (step % base_step):
+			return 
+
+		source = self.base_freq
+		for x in FREQS:
+			x_step = ts_utils.freq_ns(x)
+			if (base_step < x_step < step) and (step % x_step == 0) \
+				and (x_step % base_step == 0) and self.store.exists(symbol, x):
+				source = x
+
+		return source
+
+	def derive_bars(self, symbol, freq, source_freq, reset=False):
+		"""
+		Build freq bars from stored source_freq bars and cache them.
+
+		Only buckets past the last cached bar are aggregated, so this
+		is cheap to call after each sync of the finer bars.
+		"""
+
+		name = '%s_%s' % (symbol, freq)
+		if reset:
+			self.store.delete(symbol, freq)
+			self.data.pop(name, None)
+
+		source = self.load_bars(symbol, source_freq)
+		cur_data = self.load_store(symbol, freq)
+
+		if not cur_data.empty:
+			source = source.loc[cur_data.index[-1]+ts_utils.get_offset(freq):]
+
+		bars = resample_bars(source, freq, source_freq)
+
+		if bars.empty:
+			return cur_data
+
+		logging.debug(f'Built {len(bars)} {symbol} {freq} bars from {source_freq} bars')
+		data = pd.concat([cur_data, bars])
+		self.dump_store(data, symbol, freq)
+		return data
 
 	def load_bars(self, symbol, freq, reset=False, 
 		live=False,start_ts=1):
 
-		all_data = []
+		if not live:
+			source = self._source_freq(symbol, freq)
+			if source is not None:
+				return self.derive_bars(symbol, freq, source, reset)
 
 		if reset:
 			cur_data = pd.DataFrame()
+			if not live:
+				self.store.delete(symbol, freq)
+				self.data.pop('%s_%s' % (symbol, freq), None)
 
 		else:
 
-			cur_data = self.load_pickle(symbol, freq)
+			cur_data = self.load_store(symbol, freq)
 			if not cur_data.empty:
 				start_ts = max(start_ts,
 					ts_utils.dt2unix(cur_data.index.max())+1)
 
 		logging.debug(f'Loading {symbol} {freq} bars from {self.name}...')
-		first = None 
-
-		#ct = 0
-		while True:
-
-			data = self.api.fetch_ohlcv(symbol, freq, since = start_ts)
-			if len(data) > 0:
-
-				data_start = ts_utils.unix2dt(data[0][0])\
-					.strftime('%m/%d/%y %H:%M:%S')
-
-				data_end = ts_utils.unix2dt(data[-1][0])\
-					.strftime('%m/%d/%y %H:%M:%S')
-				
-				logging.debug(f'Loaded {symbol} {freq} bars from  ' 
-							f'{self.name}: {data_start} > {data_end}')
-
-				start_ts = data[-1][0]+1				
-
-				if cur_data.empty:
-					first = data[0][0]
-
-					if not live:
-						output = print_pct_done(start_ts,first,
-							ts_utils.dt2unix(ts_utils.cur_ts(freq)),
-							prefix = f'Downloading {symbol} {freq} bars:',
-							suffix='done')
 
-				all_data += data
-				#ct+=len(data)
-			else:
-				break
+		progress = None
+		if cur_data.empty and not live:
+			def progress(done, total):
+				print_pct_done(done, 0, total,
+					prefix = f'Downloading {symbol} {freq} bars:',
+					suffix='done')
 
-		# if 'output' in locals():
-		# 	print (output)
+		all_data = self._download(symbol, freq, start_ts, progress)
 
 		# skip the most recent bar 
 		if not live:
@@ -116,12 +199,137 @@ class BasePrices:
 
 			all_data = pd.concat([cur_data,all_data])
 			if not live:
-				self.dump_pickle(all_data, symbol, freq)
+				self.dump_store(all_data, symbol, freq)
 
 			return all_data
 
 		return cur_data
 
+	def _fetch_ohlcv(self, symbol, freq, since, limit=None):
+		# space out requests across download threads to respect 
+		# the exchange rate limit
+		with self._fetch_lock:
+			wait = self._next_fetch - time()
+			if wait > 0:
+				sleep(wait)
+			self._next_fetch = time() + self.api.rateLimit/1000
+
+		data = self.api.fetch_ohlcv(symbol, freq, since = since, limit = limit)
+
+		if len(data):
+			data_start = ts_utils.unix2dt(data[0][0])\
+				.strftime('%m/%d/%y %H:%M:%S')
+
+			data_end = ts_utils.unix2dt(data[-1][0])\
+				.strftime('%m/%d/%y %H:%M:%S')
+			
+			logging.debug(f'Loaded {symbol} {freq} bars from  ' 
+						f'{self.name}: {data_start} > {data_end}')
+		return data
+
+	def _download(self, symbol, freq, start_ts, progress=None):
+		"""
+		Download all bars from start_ts until now.
+
+		The first page tells us where history starts and the page size. 
+		The rest of the range is split into page-sized windows fetched 
+		concurrently, then stitched and de-duplicated. A final sequential 
+		pass picks up anything past the last window.
+		"""
+
+		if self.offline:
+			return []
+
+		data = self._fetch_ohlcv(symbol, freq, start_ts)
+		if not len(data):
+			return []
+
+		limit = len(data)
+		bar_ms = ts_utils.freq_ns(freq)//10**6
+		end_ts = ts_utils.dt2unix(ts_utils.cur_ts())
+		windows = list(range(data[-1][0] + bar_ms, end_ts + 1, limit*bar_ms))
+
+		pages = [data]
+		if len(windows):
+			results = [None]*len(windows)
+			with ThreadPoolExecutor(max_workers=self.download_workers) as pool:
+				futures = {pool.submit(self._fetch_ohlcv, symbol, freq, 
+					since, limit): i for i, since in enumerate(windows)}
+
+				for done, future in enumerate(as_completed(futures),1):
+					results[futures[future]] = future.result()
+					if progress:
+						progress(done, len(windows))
+
+			pages += results
+
+		bars = {}
+		for page in pages:
+			for bar in page:
+				bars[bar[0]] = bar
+
+		since = max(bars)+1
+		while True:
+			data = self._fetch_ohlcv(symbol, freq, since)
+			if not len(data):
+				break
+
+			for bar in data:
+				bars[bar[0]] = bar
+			since = data[-1][0]+1
+
+		return [bars[ts] for ts in sorted(bars)]
+
+	def prefetch(self, symbols, freqs, start_ts=None, end_ts=None):
+		"""
+		Load and update bars for every symbol and freq up front.
+
+		Symbols are synced concurrently so that a backtest loop 
+		afterwards only reads data that is already loaded.
+
+		Parameters
+		----------
+		symbols : list of str
+			Symbols to load (IE. ['ETH/USD', 'BTC/USD'])
+		freqs : str or list of str
+			Frequencies to load for each symbol.
+		start_ts : str, datetime or pandas timestamp, optional
+			Logs a warning for symbols whose history starts after start_ts.
+		end_ts : str, datetime or pandas timestamp, optional
+			Bars are synced through end_ts. Defaults to the most recent bar.
+		"""
+
+		if type(freqs)==str:
+			freqs = [freqs]
+
+		if type(start_ts)==str:
+			start_ts = pd.to_datetime(start_ts)
+
+		if type(end_ts)==str:
+			end_ts = pd.to_datetime(end_ts)
+
+		with ThreadPoolExecutor(max_workers=self.download_workers) as pool:
+			futures = [pool.submit(self._prefetch, symbol, freq, start_ts, end_ts)
+				for symbol in symbols for freq in freqs]
+
+			for future in futures:
+				future.result()
+
+	def _prefetch(self, symbol, freq, start_ts, end_ts):
+		max_ts = ts_utils.cur_ts(freq) - ts_utils.get_offset(freq)
+
+		if end_ts is None:
+			end_ts = max_ts
+		else:
+			end_ts = min(max_ts, end_ts)
+
+		data = self._get_bars(symbol, None, end_ts, freq)
+
+		if (start_ts is not None) and \
+			(data.empty or data.index[0] > start_ts):
+			logging.warning(f'{symbol} {freq} bars start after '
+				f'{start_ts.strftime("%d-%b-%y %H:%M:%S")}')
+
 	@lru_cache(16)
 	def get_price_start(self,symbol,freq=None):
 		# if not hasattr(self,'_price_start'):
@@ -133,11 +341,11 @@ class BasePrices:
 		# name = '%s_%s'%(symbol,freq)
 		# if name in self._price_start:
 		# 	return self._price_start[name]
-		data = self.load_pickle(symbol,freq)
+		data = self.load_store(symbol,freq)
 		res = None
 		if not data.empty:
 			res = data.index[0]
-		else:
+		elif not self.offline:
 			bar = self.api.fetch_ohlcv(symbol, freq, since = 0,limit = 1)
 			if len(bar):
 				res = ts_utils.unix2dt(bar[0][0])
@@ -150,12 +358,12 @@ class BasePrices:
         Pull historical symbol bars of size freq between start_ts and end_ts
 
         On the first call, the function will download all bars of size `freq` for `symbol` 
-        and cache it as a pickle file. On each subsequent call, if `end_ts` is contained 
-        within the data in the pickle file, the function simpley reads from the pickle. 
+        and cache it in the bar store. On each subsequent call, if `end_ts` is contained 
+        within the stored data, the function simply reads from the store. 
         If `end_ts` is beyond what has been downloaded, the incremental data will be 
-        downloaded, cached and then returned.
+        downloaded, appended to the store and then returned.
 
-        Pickle files are stored in MyTWSQ/data/
+        Bars are stored in MyTWSQ/data/<exchange>/
 
         Parameters
         ----------
@@ -193,7 +401,7 @@ class BasePrices:
 		if freq is None:
 			freq = self.freq
 		
-		data = self.load_pickle(symbol, freq)
+		data = self.load_store(symbol, freq)
 		end_ts = min(end_ts, ts_utils.cur_ts(freq))
 
 		if not data.empty:
@@ -204,9 +412,43 @@ class BasePrices:
 
 		return data.loc[start_ts:end_ts]
 
+	def _bar_index(self, symbol, freq, end_ts):
+		# integer-position index over bars, synced through end_ts (unix nanos)
+		name = '%s_%s' % (symbol, freq)
+		data = self.load_store(symbol, freq)
+		index = self._indexes.get(name)
+
+		if (index is None) or (index.data is not data):
+			index = BarIndex(data)
+			self._indexes[name] = index
+
+		if (end_ts > index.last_ts) and (end_ts > index.checked_ts):
+			self._get_bars(symbol, None, pd.Timestamp(end_ts), freq)
+			data = self.load_store(symbol, freq)
+
+			if index.data is not data:
+				index = BarIndex(data)
+				self._indexes[name] = index
+
+			index.checked_ts = end_ts
+
+		return index
+
 	def get_lastn_bars(self,symbol, num_bars, freq, lag=0):
 
-		if hasattr(self, 'ts'):
+		if hasattr(self, 'ts') and ts_utils.is_fixed(freq):
+
+			# backtest mode: integer slice of the bar index
+			step = ts_utils.freq_ns(freq)
+			ts = self.ts.value
+			end_ts = ts - step*(lag+1)
+			start_ts = ts - step*(num_bars+lag)
+
+			index = self._bar_index(symbol, freq, end_ts)
+			i, j = index.slice(start_ts, end_ts, num_bars)
+			return index.data.iloc[i:j]
+
+		elif hasattr(self, 'ts'):
 			
 			# this means we're in backtest mode 
 			offset = ts_utils.get_offset(freq)
@@ -256,6 +498,63 @@ class BasePrices:
 				else:
 					return bars.loc[start_ts:end_ts]
 
+	def first_cross(self, symbol, freq, start_ts, end_ts, bid=None, ask=None):
+		"""
+		Open time (int nanos) of the first freq bar with open time from 
+		start_ts to end_ts (int nanos) that trades at or through bid or 
+		ask, or None. Lets backtests skip bars while limit orders rest.
+		"""
+		index = self._bar_index(symbol, freq, end_ts)
+		i = int(np.searchsorted(index.ts, start_ts, 'left'))
+		j = int(np.searchsorted(index.ts, end_ts, 'right'))
+
+		opens = index.column('open')[i:j]
+		hit = np.zeros(j - i, dtype=bool)
+
+		if bid is not None:
+			hit |= np.minimum(index.column('low')[i:j], opens) <= bid
+
+		if ask is not None:
+			hit |= np.maximum(index.column('high')[i:j], opens) >= ask
+
+		if hit.any():
+			return int(index.ts[i + int(hit.argmax())])
+
+	def get_lastn_panel(self, symbols, num_bars, freq, field='close', lag=0):
+		"""
+		Last num_bars bars of field for many symbols as one frame, 
+		indexed by bar open time on a regular freq grid with one 
+		column per symbol. Missing bars are nan.
+		"""
+		if hasattr(self, 'ts') and ts_utils.is_fixed(freq):
+
+			# backtest mode: place each symbol's bar index slice on 
+			# the grid by integer arithmetic on the open times
+			step = ts_utils.freq_ns(freq)
+			ts = self.ts.value
+			end_ts = ts - step*(lag+1)
+			start_ts = ts - step*(num_bars+lag)
+
+			values = np.full((num_bars, len(symbols)), np.nan)
+			for col, symbol in enumerate(symbols):
+				index = self._bar_index(symbol, freq, end_ts)
+				i, j = index.slice(start_ts, end_ts, num_bars)
+				rows = (index.ts[i:j] - start_ts) // step
+				values[rows, col] = index.column(field)[i:j]
+
+			grid = pd.DatetimeIndex(np.arange(start_ts, end_ts + 1, step)\
+				.astype('datetime64[ns]'), name = 'ts')
+			return pd.DataFrame(values, index = grid, columns = list(symbols))
+
+		offset = ts_utils.get_offset(freq)
+		ts = self.ts if hasattr(self, 'ts') else ts_utils.cur_ts(freq)
+		grid = pd.date_range(ts - offset*(num_bars+lag), ts - offset*(lag+1),
+			freq = ts_utils.pandas_freq(freq), name = 'ts')
+
+		panel = {symbol: self.get_lastn_bars(symbol, num_bars, freq, lag)[field] 
+			for symbol in symbols}
+		return pd.DataFrame(panel, columns = list(symbols)).reindex(grid)
+
 	def set_live_bars(self,bars,freq):
 		freq = self.ccxt.timeframes[freq]
 		self.live_bars[freq] = bars
@@ -265,9 +564,84 @@ class BasePrices:
 			self.ccxt.timeframes[freq],{})
 		return live_bars
 
+	def _check_snapshot(self):
+		# snapshot is only valid for the bar it was built on
+		if self._snapshot_ts != self.ts:
+			self._snapshot_ts = self.ts
+			self._prices = {}
+			self._last_bars = {}
+
+	def get_last_bar(self, symbol, freq):
+		"""
+		Bar of size freq ending at the current backtest time as a dict, 
+		or None if there is no such bar. Cached until pricing.ts moves.
+		"""
+		self._check_snapshot()
+		key = (symbol, freq)
+
+		if key not in self._last_bars:
+			bars = self.get_lastn_bars(symbol, 1, freq)
+			if bars.empty:
+				self._last_bars[key] = None
+			else:
+				self._last_bars[key] = bars.iloc[-1].to_dict()
+
+		return self._last_bars[key]
+
+	def get_indicator(self, symbol, freq, key, func, history=None, lag=0):
+		"""
+		Value of indicator func on the last completed freq bar.
+
+		In fixed freq backtests func runs once over every stored bar and 
+		later calls read the series at the bar index position, so func 
+		must not look ahead. Otherwise func runs over the last history 
+		bars (INDICATOR_BARS by default) once per new bar. key 
+		identifies func and its parameters in the cache.
+		"""
+		if hasattr(self, 'ts') and ts_utils.is_fixed(freq):
+			end_ts = self.ts.value - ts_utils.freq_ns(freq)*(lag+1)
+			index = self._bar_index(symbol, freq, end_ts)
+
+			name = (symbol, freq, key)
+			cached = self._indicators.get(name)
+			if (cached is None) or (cached[0] is not index.data):
+				# new or re-synced bars
+				values = np.asarray(func(index.data), dtype=float)
+				cached = (index.data, values)
+				self._indicators[name] = cached
+
+			pos = index.locate(end_ts)
+			return cached[1][pos-1] if pos else np.nan
+
+		bars = self.get_lastn_bars(symbol, history or INDICATOR_BARS, freq, lag)
+		if bars.empty:
+			return np.nan
+
+		name = (symbol, freq, key, lag)
+		cached = self._indicators.get(name)
+		if (cached is None) or (cached[0] != bars.index[-1]):
+			value = float(np.asarray(func(bars), dtype=float)[-1])
+			cached = (bars.index[-1], value)
+			self._indicators[name] = cached
+
+		return cached[1]
+
 	def get_current_price(self, symbol):
-		if hasattr(self, 'ts'):
+		if hasattr(self, 'ts') and ts_utils.is_fixed(self.freq):
 			# backtesting mode 
+			self._check_snapshot()
+			# alphas sharing pricing may price the same ts at different freqs
+			key = (symbol, self.freq)
+			if key in self._prices:
+				return self._prices[key]
+
+			end_ts = self.ts.value - ts_utils.freq_ns(self.freq)
+			index = self._bar_index(symbol, self.freq, end_ts)
+			price = index.data['close'].values[:index.locate(end_ts)][-1]
+			self._prices[key] = price
+			return price
+
+		elif hasattr(self, 'ts'):
 			offset = ts_utils.get_offset(self.freq)
 			end_ts = self.ts - offset
 			bars = self._get_bars(symbol,None,end_ts,self.freq)
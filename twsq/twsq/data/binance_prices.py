@@ -16,10 +16,31 @@ class BinancePrices(BasePrices):
 			
 		return BasePrices.get_current_price(self,symbol)
 
+	def get_last_bar(self, symbol, freq):
+		symbol = BinanceAPI.usd2usdt(symbol)
+		return BasePrices.get_last_bar(self,symbol,freq)
+
+	def get_lastn_panel(self, symbols, num_bars, freq, field='close', lag=0):
+		if not hasattr(self,'ts'):
+			return BasePrices.get_lastn_panel(self,symbols,num_bars,freq,field,lag)
+
+		panel = BasePrices.get_lastn_panel(self,
+			[BinanceAPI.usd2usdt(x) for x in symbols],num_bars,freq,field,lag)
+		panel.columns = list(symbols)
+		return panel
+
+	def get_indicator(self, symbol, freq, key, func, history=None, lag=0):
+		symbol = BinanceAPI.usd2usdt(symbol)
+		return BasePrices.get_indicator(self,symbol,freq,key,func,history,lag)
+
 	def get_bars(self, symbol, freq = '1d', start_ts = None, end_ts = None):
 		symbol = BinanceAPI.usd2usdt(symbol)
 		return BasePrices.get_bars(self,symbol,freq,start_ts,end_ts)
 
+	def prefetch(self, symbols, freqs, start_ts=None, end_ts=None):
+		symbols = [BinanceAPI.usd2usdt(x) for x in symbols]
+		return BasePrices.prefetch(self,symbols,freqs,start_ts,end_ts)
+
 	def get_lastn_bars(self,symbol,num_bars,freq,lag=0):
 		if hasattr(self,'ts'):
 			symbol = BinanceAPI.usd2usdt(symbol)
@@ -0,0 +1,55 @@
+from twsq.utils import ts_utils
+import numpy as np
+import pandas as pd
+
+def resample_bars(data, freq, source_freq):
+	"""
+	Aggregate OHLCV bars of size source_freq into bars of size freq.
+
+	Bars are bucketed on the same epoch-aligned boundaries as 
+	ts_utils.last_bar. The trailing bucket is dropped unless the 
+	source bars cover it completely.
+
+	Parameters
+	----------
+	data : DataFrame
+		Source bars indexed by bar open time.
+	freq : str
+		Target frequency. Must be a whole multiple of source_freq.
+	source_freq : str
+		Frequency of the bars in data.
+
+	Returns
+	-------
+	DataFrame 
+	columns = ['open','high','low','close','volume']
+	index = Bar open times
+	"""
+
+	columns = ['open','high','low','close','volume']
+	if data.empty:
+		return pd.DataFrame(columns = columns)
+
+	step = ts_utils.freq_ns(freq)
+	source_step = ts_utils.freq_ns(source_freq)
+
+	ts = data.index.values.astype('datetime64[ns]').astype(np.int64)
+	buckets = ts - ts % step
+
+	starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+	ends = np.r_[starts[1:], len(ts)] - 1
+
+	bars = pd.DataFrame({
+		'open': data['open'].values[starts],
+		'high': np.maximum.reduceat(data['high'].values, starts),
+		'low': np.minimum.reduceat(data['low'].values, starts),
+		'close': data['close'].values[ends],
+		'volume': np.add.reduceat(data['volume'].values, starts),
+		}, index = pd.DatetimeIndex(buckets[starts].astype('datetime64[ns]'), 
+			name = data.index.name))
+
+	if buckets[-1] + step > ts[-1] + source_step:
+		# last bucket is still filling up
+		bars = bars.iloc[:-1]
+
+	return bars
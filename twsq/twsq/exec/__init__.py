@@ -1,5 +1,12 @@
 from .wrapper import get_broker
 from .order import Order
+from .ledger import Ledger
+from .results import ResultsWriter
+from .registry import RunRegistry
 from .backtest import *
 from .runner import *
+from .vectorized import VectorizedBacktestRunner
+from .sweep import run_sweep, expand_grid
+from .walk_forward import run_walk_forward, split_windows
+from .monte_carlo import run_monte_carlo
 from .bot import Bot
\ No newline at end of file
@@ -1,12 +1,15 @@
 from .broker import Broker 
+from .order_book import SortedOrderBook
 from twsq.data import BinancePrices
 from twsq.api import get_api, BinanceAPI 
+import numpy as np
 
 class BacktestBroker(Broker):
 
 	def __init__(self):
 		Broker.__init__(self)
 		self.is_backtesting = True
+		self._orders = SortedOrderBook()
 
 
 	def _route(self,order):
@@ -21,102 +24,124 @@ class BacktestBroker(Broker):
 		self._process_fill(order,status,order.qty_filled,
 			order.ntn_filled,order.avg_px,order.fee)
 
-	def fill_orders(self, freq, order_type='all'):
-		ct = 0 
-		for order in self._orders:	
-			
-			ct+=1
-			avg_px = 0 
-			if (order.type != order_type) and (order_type!='all'):
-				continue
+	def fill_orders(self, freq, order_type='all', strategy=None):
+		"""
+		Fill open orders against the bar ending at the current time.
 
-			elif (order.type=='market'):
+		Orders are grouped by symbol so each bar is looked up once. 
+		Only limit orders the bar trades through are pulled from the 
+		price-sorted book. Prices, slippage and fees are computed for 
+		all fills at once, then fills are processed in the order the 
+		orders were routed. strategy limits the pass to one strategy's 
+		orders.
+		"""
 
-				bar = self.pricing.get_lastn_bars(order.symbol,1,freq)
-				if order.start_ts < self.pricing.ts:
-					# missing bar led to not being filled
-					field = 'open'
+		book = self._orders
+		market = order_type in ('all','market')
+		limit = order_type in ('all','limit')
 
-				else:
-					field = 'close'
+		new_orders = [x for x in book.new_orders() 
+			if (x.type == order_type) or (order_type == 'all')]
 
-				if bar.empty:
-					avg_px = 0
+		if strategy is not None:
+			new_orders = [x for x in new_orders if x.strategy == strategy]
 
-				else:
-					avg_px = bar.iloc[-1][field]
+		orders = []
+		prices = []
 
-					if order.side=='buy':
-						avg_px = avg_px + avg_px*self.slip
-					else:
-						avg_px = avg_px - avg_px*self.slip
+		for symbol in book.symbols(market, limit):
 
+			bar = self.pricing.get_last_bar(symbol,freq)
+			if bar is None:
+				continue
 
-			elif (order.type=='limit'):
+			if market:
+				for order in book.market_orders(symbol):
+					if order.start_ts < self.pricing.ts:
+						# missing bar led to not being filled
+						field = 'open'
+
+					else:
+						field = 'close'
 
-				bar = self.pricing.get_lastn_bars(order.symbol,1,freq)
-				if bar.empty:
-					avg_px = 0
+					orders.append(order)
+					prices.append(bar[field])
 
-				else:
-					bar = bar.iloc[-1]
-					limit_price = order.limit_price
+			if limit:
+				for order in book.crossing_bids(symbol, 
+					min(bar['low'], bar['open'])):
 
-					if order.side == 'sell':
+					if (order.status=='new') \
+						and (order.limit_price >= bar['open']):
+						# marketable limit order
+						orders.append(order)
+						prices.append(bar['open'])
 
-						if (order.status=='new') \
-							and (limit_price <= bar['open']):
-							# marketable limit order
-							avg_px = bar['open']
+					elif order.limit_price >= bar['low']:
+						orders.append(order)
+						prices.append(order.limit_price)
 
-						elif limit_price <= bar['high']:
-							avg_px = limit_price
+				for order in book.crossing_asks(symbol, 
+					max(bar['high'], bar['open'])):
 
-						else:
-							pass
+					if (order.status=='new') \
+						and (order.limit_price <= bar['open']):
+						# marketable limit order
+						orders.append(order)
+						prices.append(bar['open'])
 
-					elif order.side == 'buy':
+					elif order.limit_price <= bar['high']:
+						orders.append(order)
+						prices.append(order.limit_price)
 
-						if (order.status=='new') \
-							and (limit_price >= bar['open']):
-							# marketable limit order
-							avg_px = bar['open']
+		if strategy is not None:
+			keep = [i for i, x in enumerate(orders) if x.strategy == strategy]
+			orders = [orders[i] for i in keep]
+			prices = [prices[i] for i in keep]
 
-						elif limit_price >= bar['low']:
-							avg_px = limit_price
+		if len(orders):
 
-						else:
-							pass
+			is_market = np.array([x.type=='market' for x in orders])
+			is_buy = np.array([x.side=='buy' for x in orders])
+			qty = np.array([x.qty for x in orders], dtype = float)
+			avg_px = np.array(prices, dtype = float)
 
-			if avg_px > 0:
+			avg_px = np.where(is_market & is_buy, avg_px + avg_px*self.slip, 
+				np.where(is_market, avg_px - avg_px*self.slip, avg_px))
 
-				status = 'closed'
-				qty_filled = order.qty 
-				ntn_filled = avg_px*qty_filled
+			ntn = avg_px*qty
+			fee = np.where(is_market, ntn*self.taker_fee, ntn*self.maker_fee)
 
-				if order.type=='limit':
-					fee = ntn_filled*self.maker_fee
+			for i in np.argsort([book.seq(x) for x in orders], kind='stable'):
+				order = orders[i]
 
-				elif order.type=='market':
-					fee = ntn_filled*self.taker_fee
+				if (order not in book) or (avg_px[i] <= 0):
+					# canceled in an earlier fill's on_finished_order
+					continue
 
 				self._process_fill(
-					order, status, qty_filled,
-					ntn_filled, avg_px, fee
+					order, 'closed', order.qty,
+					ntn[i], avg_px[i], fee[i]
 					)
 
-			elif order.status=='new':
-				order.status = 'open'
+		for order in new_orders:
+			if (order in book) and (order.status=='new'):
+				book.mark_open(order)
 
 
 class BacktestBinance(BacktestBroker):
 
-	def __init__(self,taker_fee = None, maker_fee = None, slip = None):
+	def __init__(self,taker_fee = None, maker_fee = None, slip = None,
+		connection = None):
 		BacktestBroker.__init__(self)
 
-		self.pricing = BinancePrices()
+		if connection is None:
+			self._connect()
+		else:
+			# reuse another broker's pricing and api instead of reconnecting
+			self.pricing = connection.pricing
+			self.api = connection.api
 		self._default_sec_type = 'crypto'
-		self.api = get_api('Binance')
 
 		if maker_fee is None:
 			maker_fee = 16e-4
@@ -131,9 +156,22 @@ class BacktestBinance(BacktestBroker):
 		self.taker_fee = taker_fee
 		self.slip = slip
 
+	def _connect(self):
+		self.pricing = BinancePrices()
+		self.pricing.mmap = True
+		self.api = None if self.pricing.offline else get_api('Binance')
+
+	def __setstate__(self, state):
+		BacktestBroker.__setstate__(self, state)
+		self._connect()
+
 	def _set_order_currency(self,order):
-		base = self.api.markets[order.symbol]['base']
-		quote = self.api.markets[order.symbol]['quote']
+		if self.api is None:
+			# offline: symbols are BASE/QUOTE
+			base, quote = order.symbol.split('/')
+		else:
+			base = self.api.markets[order.symbol]['base']
+			quote = self.api.markets[order.symbol]['quote']
 		order.set_currency(base, quote)
 
 	def create_order(
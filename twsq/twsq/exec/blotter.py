@@ -0,0 +1,167 @@
+from .order import Order
+from array import array
+import numpy as np
+import pandas as pd 
+
+class Blotter:
+	"""
+	Finished orders stored column by column in typed arrays.
+
+	Numbers are kept as doubles, timestamps as int64 nanos and 
+	repeated strings (symbol, side, status, ...) as integer codes, 
+	so finished orders no longer need to be kept as objects and 
+	export to a DataFrame without building a dict per order.
+	"""
+
+	floats = ('qty','limit_price','qty_filled','ntn_filled',
+		'avg_px','fee','arrival_px')
+	times = ('start_ts','end_ts')
+	codes = ('strategy','symbol','side','sec_type','type','status',
+		'base','quote')
+	objects = ('custom_id','id')
+
+	def __init__(self):
+		self.n = 0
+		self._floats = {x: array('d') for x in self.floats}
+		self._times = {x: array('q') for x in self.times}
+		self._codes = {x: array('i') for x in self.codes}
+		self._labels = {x: {} for x in self.codes}
+		self._objects = {x: [] for x in self.objects}
+
+	def __len__(self):
+		return self.n
+
+	@classmethod
+	def from_orders(cls, orders):
+		blotter = cls()
+		for order in orders:
+			blotter.append(order)
+		return blotter
+
+	def append(self, order):
+		for x in self.floats:
+			value = getattr(order, x)
+			self._floats[x].append(np.nan if value is None else value)
+
+		for x in self.times:
+			value = getattr(order, x)
+			self._times[x].append(pd.NaT.value if value is None \
+				else pd.Timestamp(value).value)
+
+		for x in self.codes:
+			value = getattr(order, x)
+			labels = self._labels[x]
+			code = labels.get(value)
+
+			if code is None:
+				code = len(labels)
+				labels[value] = code 
+
+			self._codes[x].append(code)
+
+		for x in self.objects:
+			self._objects[x].append(getattr(order, x))
+
+		self.n += 1
+
+	def extend(self, frame):
+		"""
+		Append finished orders from a frame with one column per 
+		Order field, as built by to_frame.
+		"""
+		for x in self.floats:
+			values = frame[x].to_numpy(dtype=np.float64, na_value=np.nan)
+			self._floats[x].frombytes(values.tobytes())
+
+		for x in self.times:
+			values = pd.to_datetime(frame[x]).values.astype('datetime64[ns]')
+			self._times[x].frombytes(values.view(np.int64).tobytes())
+
+		for x in self.codes:
+			labels = self._labels[x]
+			for value in frame[x].unique():
+				if value not in labels:
+					labels[value] = len(labels)
+
+			codes = frame[x].map(labels).to_numpy(dtype=np.int32)
+			self._codes[x].frombytes(codes.tobytes())
+
+		for x in self.objects:
+			self._objects[x].extend(frame[x].tolist())
+
+		self.n += len(frame)
+
+	def pop(self, strategy = None):
+		"""
+		Finished orders (of strategy) as a DataFrame, removed 
+		from the blotter.
+		"""
+		df = self.to_frame(strategy)
+		if df.empty:
+			return df
+
+		keep = None
+		if strategy is not None:
+			code = self._labels['strategy'][strategy]
+			keep = np.frombuffer(self._codes['strategy'], dtype=np.int32) != code
+
+		if (keep is None) or not keep.any():
+			labels = self._labels
+			self.__init__()
+			# codes stay valid for orders appended later
+			self._labels = labels
+			return df
+
+		for x in self.floats:
+			values = np.frombuffer(self._floats[x], dtype=np.float64)[keep]
+			self._floats[x] = array('d', values.tobytes())
+
+		for x in self.times:
+			values = np.frombuffer(self._times[x], dtype=np.int64)[keep]
+			self._times[x] = array('q', values.tobytes())
+
+		for x in self.codes:
+			values = np.frombuffer(self._codes[x], dtype=np.int32)[keep]
+			self._codes[x] = array('i', values.tobytes())
+
+		for x in self.objects:
+			self._objects[x] = [v for v, k in zip(self._objects[x], keep) if k]
+
+		self.n = int(keep.sum())
+		return df
+
+	def to_frame(self, strategy = None):
+		"""
+		Finished orders as a DataFrame with one column per 
+		Order field, optionally only those of strategy.
+		"""
+
+		if not self.n:
+			return pd.DataFrame()
+
+		mask = slice(None)
+		if strategy is not None:
+			code = self._labels['strategy'].get(strategy, -1)
+			mask = np.frombuffer(self._codes['strategy'], dtype=np.int32) == code
+
+		data = {}
+		for x in Order.FIELDS:
+			if x in self.floats:
+				values = np.frombuffer(self._floats[x], dtype=np.float64)[mask]
+
+			elif x in self.times:
+				values = np.frombuffer(self._times[x], dtype=np.int64)[mask]
+				values = values.astype('datetime64[ns]')
+
+			elif x in self.codes:
+				labels = np.empty(len(self._labels[x]), dtype=object)
+				labels[:] = list(self._labels[x])
+				values = labels[np.frombuffer(self._codes[x], dtype=np.int32)[mask]]
+
+			else:
+				values = pd.Series(self._objects[x]).values[mask]
+
+			# copy so the arrays can keep growing
+			data[x] = np.array(values)
+
+		return pd.DataFrame(data)
@@ -1,4 +1,5 @@
-from twsq.exec import BacktestBinance, BacktestRunner, Runner
+from twsq.exec import BacktestBinance, BacktestRunner, MultiBacktestRunner, \
+	Runner, run_sweep, run_walk_forward, run_monte_carlo
 from twsq.utils import set_logging, ts_utils
 
 class Bot:
@@ -55,4 +56,102 @@ class Bot:
 		runner = BacktestRunner(alpha,start_ts,end_ts)
 		runner.run()						
 
+	def run_backtests(self, alphas, start_ts = None, end_ts = None,
+			taker_fee=None, maker_fee=None, slip=None):
 
+		"""
+		Backtest several strategies in one pass over the data 
+
+		All strategies share one broker and one pricing cache, and each 
+		one calls rebalance on its own freq. Results match running 
+		each strategy through run_backtest on its own.
+
+		Parameters
+		----------
+		alphas : list
+			Alpha classes, or (Alpha, params) tuples where params is a 
+			dict of name, freq and custom strategy parameters. Names 
+			must be unique, so set name when running one Alpha twice.
+		start_ts : str, datetime or pandas timestamp, optional
+			start time of backtest. default is 365 days prior to end_ts
+		end_ts : str, datetime or pandas timestamp, optional
+			end time of backtest. default is current time.
+		taker_fee : float, optional
+			Commissions for market orders. Will default to Kraken's fee of 26 bps
+			per dollar traded.
+		maker_fee : float, optional
+			Commissions for limit orders. Will default to Kraken's fee of 16 bps
+			per dollar traded.
+		slip : float, optional
+			Slippage for market orders. Will default to 10 bps per dollar traded.
+
+		Returns
+		-------
+		dict
+		Instantiated strategies by name. Positions / pnl and orders 
+		are also stored by name in Bot.pos_pnl and Bot.orders
+		"""
+
+		broker = BacktestBinance(taker_fee, maker_fee, slip)
+
+		instances = []
+		for Alpha in alphas:
+			params = {}
+			if isinstance(Alpha, tuple):
+				Alpha, params = Alpha
+
+			instances.append(Alpha(broker, **params))
+
+		set_logging(debug=False)
+		runner = MultiBacktestRunner(instances, start_ts, end_ts)
+		runner.run()
+
+		for alpha in instances:
+			self.pos_pnl[alpha.name] = alpha.pos_pnl
+			self.orders[alpha.name] = alpha.orders
+
+		return {x.name: x for x in instances}
+
+	def run_sweep(self, Alpha, grid, start_ts = None, end_ts = None,
+			freq='1h', taker_fee=None, maker_fee=None, slip=None,
+			processes=None, **kwargs):
+
+		"""
+		Run backtests on Alpha for a grid of parameters in parallel. 
+		See Alpha.run_sweep
+		"""
+
+		set_logging(debug=False)
+		return run_sweep(Alpha, grid, start_ts, end_ts, processes = processes,
+			freq = freq, taker_fee = taker_fee, maker_fee = maker_fee, 
+			slip = slip, **kwargs)
+
+	def run_walk_forward(self, Alpha, grid, start_ts, end_ts, train, test, 
+			step=None, metric='sharpe', minimize=False, freq='1h', 
+			taker_fee=None, maker_fee=None, slip=None, processes=None, **kwargs):
+
+		"""
+		Walk-forward optimization of Alpha. See Alpha.run_walk_forward
+		"""
+
+		set_logging(debug=False)
+		return run_walk_forward(Alpha, grid, start_ts, end_ts, train, test, 
+			step = step, metric = metric, minimize = minimize, 
+			processes = processes, freq = freq, taker_fee = taker_fee, 
+			maker_fee = maker_fee, slip = slip, **kwargs)
+
+	def run_monte_carlo(self, Alpha, start_ts = None, end_ts = None, 
+			n_paths=100, block=24, fee_jitter=0, slip_jitter=0, freq='1h', 
+			taker_fee=None, maker_fee=None, slip=None, seed=None, 
+			processes=None, **kwargs):
+
+		"""
+		Backtest Alpha over many resampled price paths in parallel. 
+		See Alpha.run_monte_carlo
+		"""
+
+		set_logging(debug=False)
+		return run_monte_carlo(Alpha, start_ts, end_ts, n_paths = n_paths, 
+			block = block, fee_jitter = fee_jitter, slip_jitter = slip_jitter, 
+			seed = seed, processes = processes, freq = freq, 
+			taker_fee = taker_fee, maker_fee = maker_fee, slip = slip, **kwargs)
\ No newline at end of file
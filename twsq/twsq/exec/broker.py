@@ -1,4 +1,7 @@
 from .order import Order
+from .ledger import Ledger
+from .order_book import OrderBook
+from .blotter import Blotter
 import logging 
 from datetime import datetime 
 import pandas as pd 
@@ -10,14 +13,23 @@ class Broker:
 	def __init__(self):
 		
 		self.name = self.__class__.__name__ 
-		self._orders = []
-		self._closed_orders = []
+		self._orders = OrderBook()
+		self.blotter = Blotter()
 		self.is_backtesting = False
 		self.pos = {}
-		self.port_val = {}
-		self.hist_pos = {}
+		self.ledgers = {}
 		self.alphas = {}
 
+	def __getstate__(self):
+		# market data and api connections are rebuilt on load
+		state = self.__dict__.copy()
+		state.pop('pricing', None)
+		state.pop('api', None)
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+
 	def wait_till_ready(self):
 		return
 
@@ -29,9 +41,19 @@ class Broker:
 			crncy='USD'
 		return crncy
 
-	@property
-	def all_orders(self):
-		return self._orders + self._closed_orders
+	def get_orders_frame(self, strategy = None):
+		# open orders followed by finished orders
+		open_orders = list(self._orders) if strategy is None \
+			else self._orders.by_strategy(strategy)
+
+		frames = [Blotter.from_orders(open_orders).to_frame(),
+			self.blotter.to_frame(strategy)]
+
+		frames = [x for x in frames if not x.empty]
+		if not len(frames):
+			return pd.DataFrame()
+
+		return pd.concat(frames, axis=0, ignore_index=True)
 
 	@property
 	def ts(self):
@@ -106,7 +128,7 @@ class Broker:
 						  f'but attempted to route {order} on {cur_ts}. Please adjust backtest start date.'
 					raise Exception(msg)
 		
-		self._orders.append(order)
+		self._orders.add(order)
 		try:
 			self._route(order)
 		except Exception as e:
@@ -115,21 +137,18 @@ class Broker:
 
 
 	def get_order(self, id_):
-		for order in self._orders:
-			if order.id == id_:
-				return order
+		return self._orders.get(id_)
+
+	def get_open_orders(self, strategy):
+		return self._orders.by_strategy(strategy)
 
 	def cancel_order(self,custom_id, strategy):
-		for order in self._orders:
-			if (order.custom_id == custom_id) \
-				and order.strategy == strategy:
-				
-				self._cancel_order(order)
+		for order in self._orders.by_custom_id(strategy, custom_id):
+			self._cancel_order(order)
 
 	def cancel_all_orders(self,strategy):
-		for order in self._orders:
-			if order.strategy == strategy:
-				self._cancel_order(order)
+		for order in self._orders.by_strategy(strategy):
+			self._cancel_order(order)
 
 	def get_pos(self,strategy):
 		pos = self.pos.get(strategy)
@@ -281,25 +300,27 @@ class Broker:
 				else:
 					order.end_ts = datetime.utcnow()
 					
-				self._orders = [x for x in self._orders if x.id != order.id]
-				# we reset _orders here. so anything looping through it 
-				# will have the same contents even as we modify here and in 
-				# on_finished_orders
-				self._closed_orders.append(order)
+				# iterating _orders returns a snapshot. so anything looping 
+				# through it will have the same contents even as we modify 
+				# here and in on_finished_orders
+				self._orders.remove(order)
+				self.blotter.append(order)
 
 				if status=='closed':
 					self.alphas[order.strategy].on_finished_order(order)
 					
-	def snap_port(self,strategy):
-		ts = self.ts
+	def get_ledger(self,strategy):
+		ledger = self.ledgers.get(strategy)
 
-		hist_pos = self.hist_pos.get(strategy,{})
-		hist_pos[ts] = self.get_pos(strategy).copy()
-		self.hist_pos[strategy]=hist_pos
-		
-		port_val = self.port_val.get(strategy,pd.Series())
-		port_val[ts] = self.get_port_val(strategy)
-		self.port_val[strategy]=port_val
+		if ledger is None:
+			ledger = Ledger()
+			self.ledgers[strategy] = ledger 
+
+		return ledger
+
+	def snap_port(self,strategy):
+		self.get_ledger(strategy).append(self.ts, 
+			self.get_pos(strategy), self.get_port_val(strategy))
 
 	def get_port_val(self,strategy):
 		pos = self.get_pos(strategy).copy()
@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+from threading import Lock
+
+class Ledger:
+	"""
+	Position and portfolio value history for one strategy.
+
+	Snapshots are written into preallocated numpy arrays: one row
+	per timestamp and one position column per asset, added the first
+	time an asset is held. Capacity doubles when full so appends are
+	amortized O(1) in live trading, and backtests reserve the full
+	number of bars up front.
+	"""
+
+	def __init__(self, capacity=1024):
+		self.n = 0
+		self.assets = {}
+		self.ts = np.empty(capacity, dtype=np.int64)
+		self.port_val = np.empty(capacity)
+		self.pos = np.zeros((capacity, 8))
+		self._lock = Lock()
+
+		# value of the first snapshot, kept when rows are trimmed
+		self.first_port_val = None
+
+	def __len__(self):
+		return self.n
+
+	def __getstate__(self):
+		# locks do not pickle. drop unused capacity as well
+		state = self.__dict__.copy()
+		del state['_lock']
+		state['ts'] = self.ts[:self.n].copy()
+		state['port_val'] = self.port_val[:self.n].copy()
+		state['pos'] = self.pos[:self.n].copy()
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._lock = Lock()
+
+	def reserve(self, capacity):
+		# grow row capacity to at least capacity
+		if capacity <= len(self.ts):
+			return
+
+		ts = np.empty(capacity, dtype=np.int64)
+		ts[:self.n] = self.ts[:self.n]
+		self.ts = ts
+
+		port_val = np.empty(capacity)
+		port_val[:self.n] = self.port_val[:self.n]
+		self.port_val = port_val
+
+		pos = np.zeros((capacity, self.pos.shape[1]))
+		pos[:self.n] = self.pos[:self.n]
+		self.pos = pos
+
+	def _add_asset(self, asset):
+		col = len(self.assets)
+		if col == self.pos.shape[1]:
+			pos = np.zeros((len(self.ts), 2*col))
+			pos[:, :col] = self.pos
+			self.pos = pos
+
+		self.assets[asset] = col
+		return col
+
+	def append(self, ts, pos, port_val):
+		ts = pd.Timestamp(ts).value
+
+		with self._lock:
+			row = self.n
+			if row and (self.ts[row-1] == ts):
+				# same timestamp overwrites the last snapshot
+				row -= 1
+				self.pos[row] = 0
+
+			elif row == len(self.ts):
+				self.reserve(2*row)
+
+			self.ts[row] = ts
+			self.port_val[row] = port_val
+
+			if self.first_port_val is None:
+				self.first_port_val = port_val
+
+			for asset, qty in pos.items():
+				col = self.assets.get(asset)
+				if col is None:
+					col = self._add_asset(asset)
+				self.pos[row, col] = qty
+
+			self.n = row + 1
+
+	def extend(self, ts, pos, port_val):
+		"""
+		Append many snapshots at once. ts are int64 nanos, pos a frame 
+		with one column per asset and port_val an array, all with one 
+		row per snapshot in time order.
+		"""
+		rows = len(ts)
+
+		with self._lock:
+			if self.n + rows > len(self.ts):
+				self.reserve(max(self.n + rows, 2*len(self.ts)))
+
+			cols = []
+			for asset in pos.columns:
+				col = self.assets.get(asset)
+				if col is None:
+					col = self._add_asset(asset)
+				cols.append(col)
+
+			end = self.n + rows
+			self.ts[self.n:end] = ts
+			self.port_val[self.n:end] = port_val
+			self.pos[self.n:end, cols] = pos.values
+
+			if (self.first_port_val is None) and rows:
+				self.first_port_val = port_val[0]
+
+			self.n = end
+
+	@property
+	def last_port_val(self):
+		return self.port_val[self.n-1]
+
+	@property
+	def index(self):
+		return pd.DatetimeIndex(self.ts[:self.n].astype('datetime64[ns]'))
+
+	def port_val_series(self):
+		return pd.Series(self.port_val[:self.n].copy(), index = self.index)
+
+	def pos_frame(self):
+		return pd.DataFrame(self.pos[:self.n, :len(self.assets)].copy(),
+			index = self.index, columns = list(self.assets))
+
+	def to_frame(self, start=0, end=None):
+		"""
+		Rows start to end of the ledger as a frame with Date, port_val, 
+		pnl and one position column per asset, sorted by Date. pnl of 
+		the first row is taken against row start-1 when there is one.
+		"""
+		if end is None:
+			end = self.n
+
+		order = np.argsort(self.ts[start:end], kind='stable') + start
+		port_val = self.port_val[order]
+		prev = self.port_val[start-1:start] if start else port_val[:1]
+
+		df = pd.DataFrame(self.pos[order, :len(self.assets)],
+			columns = list(self.assets))
+
+		df.insert(0, 'Date', self.ts[order].astype('datetime64[ns]'))
+		df.insert(1, 'port_val', port_val)
+		df.insert(2, 'pnl', np.diff(port_val, prepend = prev))
+		return df
+
+	def trim(self, rows):
+		# drop the first rows, IE. once they are written to disk
+		with self._lock:
+			rows = min(rows, self.n)
+			n = self.n - rows
+			self.ts[:n] = self.ts[rows:self.n]
+			self.port_val[:n] = self.port_val[rows:self.n]
+			self.pos[:n] = self.pos[rows:self.n]
+			self.pos[n:self.n] = 0
+			self.n = n
@@ -0,0 +1,240 @@
+from .backtest import BacktestBinance
+from .runner import BacktestRunner
+from .sweep import BROKER_PARAMS, get_pool
+from twsq.analytics import summarize
+from twsq.api import BinanceAPI
+from twsq.data.resample import resample_bars
+from twsq.utils import ts_utils
+import numpy as np
+import pandas as pd 
+import logging 
+
+# base bars and broker shared by every path run in a process
+_state = {}
+
+def load_base(Alpha, freq, start_ts, end_ts):
+	"""
+	Bars of Alpha.universe that paths are resampled from.
+
+	History before the backtest window is kept as is. Window bars are 
+	put on a common time grid across symbols and turned into open, 
+	high, low and close ratios to the previous close, so resampling 
+	the same rows for every symbol keeps their co-movement.
+	"""
+
+	if not len(Alpha.universe):
+		raise ValueError('Monte Carlo runs need Alpha.universe to be set')
+
+	if not ts_utils.is_fixed(freq):
+		raise ValueError(f'Monte Carlo runs need a fixed length freq, got {freq}')
+
+	step = ts_utils.freq_ns(freq)
+	freqs = sorted(set(Alpha.universe_freqs) - {freq})
+	for x in freqs:
+		if ts_utils.freq_ns(x) % step:
+			raise ValueError(f'{x} bars cannot be built from {freq} bars')
+
+	broker = BacktestBinance()
+	pricing = broker.pricing
+	pricing.prefetch(Alpha.universe, freq, start_ts, end_ts)
+
+	symbols = [BinanceAPI.usd2usdt(x) for x in Alpha.universe]
+	grid = pd.date_range(start_ts, end_ts, freq = ts_utils.pandas_freq(freq))
+
+	history = {}
+	close = []
+	ratios = []
+	volume = []
+
+	for symbol in symbols:
+		data = pricing.load_store(symbol, freq)
+		history[symbol] = data.loc[:start_ts - pd.Timedelta(1, 'ns')]
+
+		window = data.reindex(grid)
+		if len(history[symbol]):
+			prev = history[symbol]['close'].iloc[-1]
+		else:
+			# no history: start from the first open in the window
+			prev = window['open'].dropna().iloc[0]
+
+		# previous available close for every grid bar
+		last = window['close'].ffill().shift(1).fillna(prev)
+
+		ratios.append(window[['open','high','low','close']].values
+			/ last.values[:, None])
+		volume.append(window['volume'].values)
+		close.append(prev)
+
+	return {
+		'freq': freq,
+		'freqs': freqs,
+		'symbols': symbols,
+		'grid': grid,
+		'history': history,
+		'close': np.array(close),
+		'ratios': np.stack(ratios, axis = 1),
+		'volume': np.stack(volume, axis = 1),
+		'broker': broker,
+		}
+
+def bootstrap_index(n, block, rng):
+	# moving block bootstrap of n rows
+	block = max(1, min(block, n))
+	starts = rng.integers(0, n - block + 1, size = -(-n//block))
+	return (starts[:, None] + np.arange(block)).ravel()[:n]
+
+def make_path(base, rng, block):
+	"""
+	One resampled price path as {name: DataFrame} for pricing.data. 
+	Closes are rebuilt by compounding the resampled close ratios from 
+	the last close before the window. Bars missing in the sampled 
+	rows are missing in the path.
+	"""
+	grid = base['grid']
+	idx = bootstrap_index(len(grid), block, rng)
+	ratios = base['ratios'][idx]
+	volume = base['volume'][idx]
+
+	data = {}
+	for i, symbol in enumerate(base['symbols']):
+		ratio = ratios[:, i]
+		valid = ~np.isnan(ratio[:, 3])
+
+		close = base['close'][i]*np.cumprod(np.where(valid, ratio[:, 3], 1))
+		prev = np.r_[base['close'][i], close[:-1]]
+
+		bars = pd.DataFrame({
+			'open': prev*ratio[:, 0],
+			'high': prev*ratio[:, 1],
+			'low': prev*ratio[:, 2],
+			'close': close,
+			'volume': volume[:, i],
+			}, index = grid)[valid]
+
+		bars = pd.concat([base['history'][symbol], bars])
+		bars.index.name = 'ts'
+		data['%s_%s' % (symbol, base['freq'])] = bars
+
+		for freq in base['freqs']:
+			data['%s_%s' % (symbol, freq)] = resample_bars(bars, freq, base['freq'])
+
+	return data
+
+def _init_worker(base):
+	_state['base'] = base
+
+def _run_path(args):
+	Alpha, path, seed, block, jitter, start_ts, end_ts, params = args
+	base = _state['base']
+
+	rng = np.random.default_rng([seed, path])
+	data = make_path(base, rng, block)
+
+	params = dict(params)
+	broker = BacktestBinance(*[params.pop(x, None) for x in BROKER_PARAMS],
+		connection = base['broker'])
+
+	# fee and slippage jitter as relative standard deviations
+	for name, std in jitter.items():
+		if std:
+			value = getattr(broker, name)*(1 + std*rng.standard_normal())
+			setattr(broker, name, max(value, 0))
+
+	# paths live in memory only: never sync or write bars
+	pricing = broker.pricing
+	pricing.offline = True
+	pricing.data.update(data)
+	pricing._snapshot_ts = None
+
+	freq = params.pop('freq', '1h')
+	name = params.pop('name', None)
+	alpha = Alpha(broker, name = name, freq = freq, **params)
+	runner = BacktestRunner(alpha, start_ts, end_ts, save=False, verbose=False)
+	runner.run()
+
+	res = {'path': path, 'taker_fee': broker.taker_fee, 
+		'maker_fee': broker.maker_fee, 'slip': broker.slip}
+	res.update(summarize(alpha.pos_pnl, alpha.orders))
+	res['error'] = None if runner.error is None else str(runner.error)
+	return res
+
+def run_monte_carlo(Alpha, start_ts=None, end_ts=None, n_paths=100, block=24, 
+	fee_jitter=0, slip_jitter=0, seed=None, processes=None, **kwargs):
+	"""
+	Backtest Alpha over resampled price paths across a process pool.
+
+	Each path replaces the bars of Alpha.universe inside the backtest 
+	window with a moving block bootstrap of the stored bars, optionally 
+	with fees and slippage perturbed. Base bars are loaded once and 
+	shared by the workers; paths are only built in memory.
+
+	Parameters
+	----------
+	Alpha : Alpha class
+		Strategy to backtest. Alpha.universe must list every symbol it trades.
+	start_ts, end_ts : str, datetime or pandas timestamp, optional
+		Backtest range, as in Alpha.run_backtest.
+	n_paths : int, optional
+		Number of paths.
+	block : int, optional
+		Length of resampled blocks in bars.
+	fee_jitter, slip_jitter : float, optional
+		Relative standard deviation of per-path taker / maker fees and 
+		slippage, IE. 0.2 draws fees around +-20% of their value.
+	seed : int, optional
+		Seed for reproducible paths. Path i uses the seed (seed, i).
+	processes : int, optional
+		Number of worker processes. Defaults to the number of cores. 
+		processes=1 runs in the calling process.
+
+	Strategy parameters plus freq, name, taker_fee, maker_fee and 
+	slip can be passed through **kwargs
+
+	Returns
+	-------
+	DataFrame
+	One row per path with its fees and slippage and summary metrics
+	"""
+
+	freq = kwargs.get('freq', '1h')
+
+	if type(end_ts)==str:
+		end_ts = pd.to_datetime(end_ts)
+
+	if type(start_ts)==str:
+		start_ts = pd.to_datetime(start_ts)
+
+	if end_ts is None:
+		end_ts = ts_utils.cur_ts(freq)
+	if start_ts is None:
+		start_ts = end_ts - pd.tseries.offsets.Day()*365
+
+	offset = ts_utils.get_offset(freq)
+	window_start = ts_utils.next_bar(start_ts, freq) - offset
+	window_end = min(ts_utils.cur_ts(freq), ts_utils.last_bar(end_ts, freq)) - offset
+
+	if seed is None:
+		seed = int(np.random.SeedSequence().entropy % 2**32)
+
+	base = load_base(Alpha, freq, window_start, window_end)
+
+	logging.info(f'Running {n_paths} {Alpha.__name__} Monte Carlo paths')
+
+	jitter = {'taker_fee': fee_jitter, 'maker_fee': fee_jitter, 
+		'slip': slip_jitter}
+	jobs = [(Alpha, i, seed, block, jitter, start_ts, end_ts, kwargs) 
+		for i in range(n_paths)]
+
+	try:
+		if processes == 1:
+			_init_worker(base)
+			results = [_run_path(x) for x in jobs]
+		else:
+			with get_pool(processes, _init_worker, (base,)) as pool:
+				results = pool.map(_run_path, jobs)
+	finally:
+		_state.pop('base', None)
+
+	results = pd.DataFrame(results)
+	results.attrs['seed'] = seed
+	return results
@@ -2,6 +2,13 @@ import pandas as pd
 
 class Order:
 
+	# attributes in the order they are exported to orders.csv
+	FIELDS = ('strategy','symbol','qty','side','sec_type','limit_price',
+		'type','custom_id','id','status','qty_filled','ntn_filled','avg_px',
+		'fee','start_ts','arrival_px','base','quote','end_ts')
+
+	__slots__ = FIELDS
+
 	def __init__(
 		self,
 		strategy,
@@ -37,10 +44,16 @@ class Order:
 		self.fee = 0
 		self.start_ts = start_ts
 		self.arrival_px = arrival_px
+		self.base = None
+		self.quote = None
+		self.end_ts = None
 
 	def __repr__(self):
 		repr_ = f'Order to {self.side} {self.qty} {self.symbol}'
 		return repr_
+
+	def to_dict(self):
+		return {x: getattr(self, x) for x in self.FIELDS}
 		
 	# def set_arr_px(self,px):
 	# 	self.arr_px = px
@@ -0,0 +1,199 @@
+from bisect import insort, bisect_left, bisect_right
+from math import inf
+
+class OrderBook:
+	"""
+	Registry of open orders.
+
+	Orders are indexed by exchange id, by strategy and by 
+	(strategy, custom_id) so lookups, cancels and fills do not 
+	scan every open order. Iterating returns a snapshot in the 
+	order orders were added, so orders can be added or removed 
+	while looping.
+	"""
+
+	def __init__(self):
+		# dicts keyed by order keep insertion order and give O(1) removal
+		self._orders = {}
+		self._by_id = {}
+		self._by_strategy = {}
+		self._by_custom_id = {}
+
+		# orders added before the exchange assigned an id
+		self._pending = {}
+
+	def __len__(self):
+		return len(self._orders)
+
+	def __iter__(self):
+		return iter(list(self._orders))
+
+	def __contains__(self, order):
+		return order in self._orders
+
+	def add(self, order):
+		self._orders[order] = None
+
+		if order.id is None:
+			self._pending[order] = None
+		else:
+			self._by_id[order.id] = order
+
+		self._by_strategy.setdefault(order.strategy, {})[order] = None
+
+		if order.custom_id is not None:
+			key = (order.strategy, order.custom_id)
+			self._by_custom_id.setdefault(key, {})[order] = None
+
+	def remove(self, order):
+		if order not in self._orders:
+			return
+
+		del self._orders[order]
+		self._pending.pop(order, None)
+
+		if self._by_id.get(order.id) is order:
+			del self._by_id[order.id]
+
+		orders = self._by_strategy[order.strategy]
+		del orders[order]
+		if not orders:
+			del self._by_strategy[order.strategy]
+
+		if order.custom_id is not None:
+			key = (order.strategy, order.custom_id)
+			orders = self._by_custom_id[key]
+			del orders[order]
+			if not orders:
+				del self._by_custom_id[key]
+
+	def get(self, id_):
+		order = self._by_id.get(id_)
+
+		if (order is None) and self._pending:
+			# ids are set once routed, index them on first lookup
+			for pending in list(self._pending):
+				if pending.id is not None:
+					del self._pending[pending]
+					self._by_id[pending.id] = pending
+
+			order = self._by_id.get(id_)
+
+		return order
+
+	def by_strategy(self, strategy):
+		return list(self._by_strategy.get(strategy, ()))
+
+	def by_custom_id(self, strategy, custom_id):
+		return list(self._by_custom_id.get((strategy, custom_id), ()))
+
+class SortedOrderBook(OrderBook):
+	"""
+	OrderBook that also keeps, per symbol, open market orders and 
+	limit orders sorted by price on each side. A backtest fill pass 
+	can then pull just the limit orders a bar trades through with a 
+	binary search instead of checking every resting order.
+	"""
+
+	def __init__(self):
+		OrderBook.__init__(self)
+
+		self._next_seq = 0
+		self._seq = {}
+		self._new = {}
+		self._market = {}
+
+		# (-limit_price, seq, order) for buys, (limit_price, seq, order) 
+		# for sells, so the most aggressive orders come first
+		self._bids = {}
+		self._asks = {}
+
+	def add(self, order):
+		OrderBook.add(self, order)
+
+		seq = self._next_seq
+		self._next_seq += 1
+		self._seq[order] = seq
+
+		if order.status == 'new':
+			self._new[order] = None
+
+		if order.type == 'market':
+			self._market.setdefault(order.symbol, {})[order] = None
+
+		elif order.side == 'buy':
+			insort(self._bids.setdefault(order.symbol, []), 
+				(-order.limit_price, seq, order))
+
+		else:
+			insort(self._asks.setdefault(order.symbol, []), 
+				(order.limit_price, seq, order))
+
+	def remove(self, order):
+		if order not in self:
+			return
+
+		OrderBook.remove(self, order)
+		seq = self._seq.pop(order)
+		self._new.pop(order, None)
+
+		if order.type == 'market':
+			orders = self._market[order.symbol]
+			del orders[order]
+			if not orders:
+				del self._market[order.symbol]
+
+		else:
+			if order.side == 'buy':
+				sides, key = self._bids, (-order.limit_price, seq)
+			else:
+				sides, key = self._asks, (order.limit_price, seq)
+
+			side = sides[order.symbol]
+			del side[bisect_left(side, key)]
+			if not side:
+				del sides[order.symbol]
+
+	def seq(self, order):
+		return self._seq[order]
+
+	def symbols(self, market=True, limit=True):
+		symbols = set()
+		if market:
+			symbols.update(self._market)
+		if limit:
+			symbols.update(self._bids)
+			symbols.update(self._asks)
+		return symbols
+
+	def new_orders(self):
+		return list(self._new)
+
+	def mark_open(self, order):
+		order.status = 'open'
+		self._new.pop(order, None)
+
+	def market_orders(self, symbol):
+		return list(self._market.get(symbol, ()))
+
+	def best_bid(self, symbol):
+		# highest buy limit price, or None
+		bids = self._bids.get(symbol)
+		return -bids[0][0] if bids else None
+
+	def best_ask(self, symbol):
+		# lowest sell limit price, or None
+		asks = self._asks.get(symbol)
+		return asks[0][0] if asks else None
+
+	def crossing_bids(self, symbol, price):
+		# buy limit orders with limit_price >= price, best first
+		bids = self._bids.get(symbol, ())
+		n = bisect_right(bids, (-price, inf))
+		return [x[2] for x in bids[:n]]
+
+	def crossing_asks(self, symbol, price):
+		# sell limit orders with limit_price <= price, best first
+		asks = self._asks.get(symbol, ())
+		n = bisect_right(asks, (price, inf))
+		return [x[2] for x in asks[:n]]
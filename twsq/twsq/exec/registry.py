@@ -0,0 +1,158 @@
+from .results import ResultsWriter
+from twsq.analytics import summarize
+from twsq.paths import RUNS_PATH
+from datetime import datetime
+from uuid import uuid4
+import pandas as pd 
+import numpy as np
+import hashlib
+import inspect
+import shutil
+import json 
+import os 
+
+class RunRegistry:
+	"""
+	Registry of backtest runs.
+
+	Every run gets a line in index.jsonl with its id, strategy, 
+	parameters, data range, fees, a hash of the strategy source and 
+	its summary metrics, so hundreds of runs can be listed and 
+	filtered without opening their results. pos_pnl and orders of 
+	each run are stored columnar under <path>/<run_id>/, in the 
+	ResultsWriter chunk layout, so single columns of many runs are 
+	read without loading whole results.
+	"""
+
+	def __init__(self, path = RUNS_PATH):
+		self.path = path
+		self.index_path = os.path.join(path, 'index.jsonl')
+
+	@staticmethod
+	def code_hash(cls):
+		# short hash of the strategy source, None if it is not available
+		try:
+			source = inspect.getsource(cls)
+		except (OSError, TypeError):
+			return 
+
+		return hashlib.sha1(source.encode()).hexdigest()[:12]
+
+	def record(self, alpha, start_ts, end_ts, error = None):
+		"""
+		Add a finished backtest of alpha to the registry. 
+		Returns the run id.
+		"""
+		run_id = datetime.utcnow().strftime('%Y%m%d-%H%M%S-') + uuid4().hex[:6]
+		broker = alpha.broker
+
+		entry = {
+			'run_id': run_id,
+			'created': datetime.utcnow().isoformat(),
+			'alpha': type(alpha).__name__,
+			'name': alpha.name,
+			'freq': alpha.freq,
+			'start_ts': pd.Timestamp(start_ts).isoformat(),
+			'end_ts': pd.Timestamp(end_ts).isoformat(),
+			'taker_fee': getattr(broker, 'taker_fee', None),
+			'maker_fee': getattr(broker, 'maker_fee', None),
+			'slip': getattr(broker, 'slip', None),
+			'code_hash': self.code_hash(type(alpha)),
+			'params': alpha.custom_params,
+			'error': None if error is None else str(error),
+			}
+
+		metrics = summarize(getattr(alpha, 'pos_pnl', None), 
+			getattr(alpha, 'orders', None))
+		entry.update({x: self._scalar(y) for x, y in metrics.items()})
+
+		writer = ResultsWriter(os.path.join(self.path, run_id))
+		for kind in writer.kinds:
+			df = getattr(alpha, kind, None)
+			if df is not None:
+				writer.write(kind, df.reset_index() if kind == 'pos_pnl' else df)
+
+		# one line per run; appends of a single line do not interleave
+		with open(self.index_path, 'a') as handle:
+			handle.write(json.dumps(entry, default = str) + '\n')
+
+		return run_id
+
+	@staticmethod
+	def _scalar(x):
+		# numpy scalars to json friendly values
+		x = x.item() if isinstance(x, np.generic) else x
+		return None if isinstance(x, float) and np.isnan(x) else x
+
+	def runs(self, query = None, **equals):
+		"""
+		Registered runs as a DataFrame, one row per run. Parameters 
+		are expanded into params.<name> columns.
+
+		Parameters
+		----------
+		query : str or callable, optional
+			pandas query string, IE. 'sharpe > 1 and freq == "1h"', 
+			or a function of the frame returning a boolean mask.
+
+		Columns to match exactly can be passed through **equals, 
+		IE. runs(alpha='Momentum')
+		"""
+		if not os.path.exists(self.index_path):
+			return pd.DataFrame()
+
+		with open(self.index_path) as handle:
+			entries = [json.loads(x) for x in handle if x.strip()]
+
+		df = pd.json_normalize(entries)
+		if df.empty:
+			return df
+
+		for col in ('start_ts','end_ts','created'):
+			df[col] = pd.to_datetime(df[col])
+
+		for col, value in equals.items():
+			df = df[df[col] == value]
+
+		if query is not None:
+			df = df.query(query) if isinstance(query, str) else df[query(df)]
+
+		return df.reset_index(drop = True)
+
+	def load(self, run_id, kind = 'pos_pnl', columns = None):
+		"""
+		pos_pnl (indexed by Date) or orders of a run. columns 
+		limits the columns read.
+		"""
+		path = os.path.join(self.path, run_id)
+		if os.path.dirname(os.path.normpath(path)) != os.path.normpath(self.path):
+			raise ValueError(f'Invalid run id {run_id}')
+
+		if (kind == 'pos_pnl') and (columns is not None):
+			columns = ['Date'] + list(columns)
+
+		df = ResultsWriter(path).read(kind, columns = columns)
+		if (kind == 'pos_pnl') and not df.empty:
+			df = df.set_index('Date')
+		return df
+
+	def compare(self, run_ids, field = 'port_val'):
+		"""
+		One pos_pnl field of several runs side by side, 
+		one column per run id. Only that field is read.
+		"""
+		return pd.concat({x: self.load(x, columns = [field])[field] 
+			for x in run_ids}, axis=1)
+
+	def delete(self, run_id):
+		shutil.rmtree(os.path.join(self.path, run_id), ignore_errors = True)
+
+		if os.path.exists(self.index_path):
+			with open(self.index_path) as handle:
+				lines = [x for x in handle 
+					if x.strip() and json.loads(x)['run_id'] != run_id]
+
+			tmp = self.index_path + '.tmp'
+			with open(tmp, 'w') as handle:
+				handle.writelines(lines)
+			os.replace(tmp, self.index_path)
@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd 
+from glob import glob 
+from threading import Lock
+import shutil
+import json
+import os 
+
+class ResultsWriter:
+	"""
+	Append-only results of one strategy, written in chunks.
+
+	pos_pnl rows and finished orders are flushed from the ledger 
+	and blotter once chunk_rows of them have built up, each flush 
+	going to a new numbered chunk under path/pos_pnl/ or path/orders/. 
+	Chunks are never rewritten, so memory stays bounded during a run 
+	and shutdown only writes what is left.
+
+	A chunk is laid out like the bar store: a directory with one file 
+	per column and a meta.json naming them. Numbers are .npy arrays, 
+	timestamps .npy int64 nanos and text columns json lists, so 
+	columns are read on their own and nothing is unpickled.
+	"""
+
+	kinds = ('pos_pnl','orders')
+
+	def __init__(self, path, chunk_rows=10000):
+		self.path = path
+		self.chunk_rows = chunk_rows
+
+		# chunks written by this writer, IE. the current session
+		self.session = {x: [] for x in self.kinds}
+		self._lock = Lock()
+
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		del state['_lock']
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._lock = Lock()
+
+	def _dir(self, kind):
+		path = os.path.join(self.path, kind)
+		os.makedirs(path, exist_ok = True)
+		return path
+
+	def chunks(self, kind):
+		# meta.json is written last, so chunks without one are incomplete
+		return sorted(os.path.dirname(x) for x in 
+			glob(os.path.join(self._dir(kind), '*', 'meta.json')))
+
+	def clear(self):
+		for kind in self.kinds:
+			for path in self.chunks(kind):
+				shutil.rmtree(path)
+
+	@staticmethod
+	def _write_chunk(path, df):
+		columns = []
+		for i, (name, values) in enumerate(df.items()):
+			values = values.values
+
+			if values.dtype.kind == 'M':
+				kind = 'datetime'
+				np.save(os.path.join(path, '%d.npy' % i), 
+					values.astype('datetime64[ns]').view(np.int64))
+
+			elif values.dtype.kind in 'biuf':
+				kind = 'number'
+				np.save(os.path.join(path, '%d.npy' % i), np.asarray(values))
+
+			else:
+				kind = 'text'
+				values = [None if pd.api.types.is_scalar(x) and pd.isna(x) 
+					else (x.item() if isinstance(x, np.generic) else x) 
+					for x in values]
+
+				with open(os.path.join(path, '%d.json' % i), 'w') as handle:
+					json.dump(values, handle, default = str)
+
+			columns.append({'name': name, 'kind': kind})
+
+		with open(os.path.join(path, 'meta.json'), 'w') as handle:
+			json.dump({'rows': len(df), 'columns': columns}, handle)
+
+	@staticmethod
+	def _read_chunk(path, columns=None, rows=slice(None)):
+		with open(os.path.join(path, 'meta.json')) as handle:
+			meta = json.load(handle)
+
+		data = {}
+		for i, col in enumerate(meta['columns']):
+			if (columns is not None) and (col['name'] not in columns):
+				continue
+
+			if col['kind'] == 'text':
+				with open(os.path.join(path, '%d.json' % i)) as handle:
+					values = np.array(json.load(handle), dtype = object)[rows]
+
+			else:
+				values = np.load(os.path.join(path, '%d.npy' % i), 
+					mmap_mode = 'r', allow_pickle = False)[rows]
+				values = np.array(values)
+
+				if col['kind'] == 'datetime':
+					values = values.view('datetime64[ns]')
+
+			data[col['name']] = values
+
+		return pd.DataFrame(data)
+
+	def write(self, kind, df):
+		if df.empty:
+			return
+
+		with self._lock:
+			chunks = self.chunks(kind)
+			seq = int(os.path.basename(chunks[-1])) + 1 if chunks else 0
+			path = os.path.join(self._dir(kind), '%08d' % seq)
+
+			tmp = path + '.tmp'
+			shutil.rmtree(tmp, ignore_errors = True)
+			os.makedirs(tmp)
+			self._write_chunk(tmp, df)
+			os.replace(tmp, path)
+			self.session[kind].append(path)
+
+	def read(self, kind, session=False, columns=None):
+		"""
+		All chunks of kind as one frame, or only those written by 
+		this writer with session=True. columns limits the columns read.
+		"""
+		paths = self.session[kind] if session else self.chunks(kind)
+		frames = [self._read_chunk(x, columns) for x in paths]
+		frames = [x for x in frames if not x.empty]
+
+		if not len(frames):
+			return pd.DataFrame()
+
+		return pd.concat(frames, axis=0, ignore_index=True)
+
+	def last_row(self, kind):
+		# last row written, or None. only its chunk's last row is read
+		for path in reversed(self.chunks(kind)):
+			df = self._read_chunk(path, rows = slice(-1, None))
+			if not df.empty:
+				return df.iloc[-1]
+
+	def flush(self, broker, strategy, final=False, open_orders=False):
+		"""
+		Write strategy's ledger rows and finished orders once 
+		chunk_rows of either have built up, or everything with final. 
+		The last ledger row is kept as the base for the next pnl, 
+		and, unless final, is not written since a snapshot at the 
+		same time overwrites it. open_orders adds a snapshot of 
+		open orders to the final orders chunk.
+		"""
+		ledger = broker.get_ledger(strategy)
+		blotter = broker.blotter
+
+		# row 0 is the starting position or the last row written
+		if final or (len(ledger) > self.chunk_rows + 1):
+			end = len(ledger) if final else len(ledger) - 1
+			if end > 1:
+				self.write('pos_pnl', ledger.to_frame(1, end))
+				ledger.trim(end - 1)
+
+		if final or (len(blotter) >= self.chunk_rows):
+			frames = [blotter.pop(strategy)]
+			if final and open_orders:
+				# finished orders were just popped, so only open ones are left
+				frames.append(broker.get_orders_frame(strategy))
+
+			frames = [x for x in frames if not x.empty]
+			if len(frames):
+				self.write('orders', pd.concat(frames, axis=0, ignore_index=True))
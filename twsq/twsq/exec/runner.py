@@ -1,8 +1,13 @@
 from time import sleep, time 
 import logging 
 import traceback
+import heapq
+import pickle
+import os
+import numpy as np
 from twsq.utils import ts_utils, Emojis, print_pct_done
 import pandas as pd 
+from .registry import RunRegistry
 from datetime import datetime 
 
 class Runner:
@@ -11,6 +16,7 @@ class Runner:
 
 		self.alpha = alpha 
 		self.run_event = run_event
+		self.timer = alpha.timer
 
 	@property
 	def freq(self):
@@ -41,10 +47,16 @@ class Runner:
 		self.alpha._track_pnl()
 		self.sleep(first=True)
 
+		clock = self.timer.clock
 		while self.run_event.isSet():
+			t0 = clock()
 			self.alpha.manage_open_orders()
+			t1 = clock()
 			self.alpha._n_orders = 0
 			self.alpha.rebalance()
+			t2 = clock()
+			self.timer.add('manage_open_orders', t1 - t0)
+			self.timer.add('rebalance', t2 - t1)
 			self.alpha.logging('%s Rebalance complete: Ceated %s new order(s).' 
 				% (Emojis.rebal,self.alpha._n_orders))
 			self.sleep()
@@ -80,10 +92,29 @@ class Runner:
 
 class BacktestRunner(Runner):
 
-	def __init__(self, alpha, start_ts=None, end_ts=None):
+	def __init__(self, alpha, start_ts=None, end_ts=None, 
+		save=True, verbose=True, show_timings=False, fast=False):
 
 		Runner.__init__(self, alpha, None)
 
+		# save=False keeps results on the alpha without writing them 
+		# verbose=False turns off the progress line
+		# show_timings=True adds each phase's share of time to it
+		# fast=True skips valuing the portfolio every bar, see _rebuild_ledger
+		self.save = save
+		self.verbose = verbose
+		self.show_timings = show_timings
+		self.fast = fast
+		self.error = None
+		self.resumed = False
+		self.last_ts = None
+
+		# next bar rebalance asked to run at, see _skip
+		self.wake_ts = None
+
+		if fast:
+			assert ts_utils.is_fixed(self.freq), "fast mode needs a fixed length freq"
+
 		if end_ts is None:
 			end_ts = ts_utils.cur_ts(self.freq)
 
@@ -99,10 +130,79 @@ class BacktestRunner(Runner):
 		assert start_ts <= end_ts, "start_ts must be <= end_ts"
 
 		self.start_ts  = ts_utils.next_bar(start_ts, self.freq)
+		self.first_ts = self.start_ts
 		self.end_ts = min(ts_utils.cur_ts(self.freq), ts_utils.last_bar(end_ts, self.freq))
 
 		# must initialize time for use in load_pos
-		self.alpha.broker.pricing.ts = start_ts - ts_utils.get_offset(self.freq)
+		self.init_ts = start_ts - ts_utils.get_offset(self.freq)
+		self.alpha.broker.pricing.ts = self.init_ts
+
+	def _prepare(self):
+		if not self.resumed:
+			self.alpha._prepare(save=self.save)
+
+		# load the declared universe so the loop below never downloads
+		offset = ts_utils.get_offset(self.freq)
+		self.alpha._prefetch(self.start_ts - offset, self.end_ts - offset)
+
+		# one more ledger row per bar
+		if ts_utils.is_fixed(self.freq) and (self.start_ts <= self.end_ts):
+			n_bars = (self.end_ts - self.start_ts).value \
+				// ts_utils.freq_ns(self.freq) + 1
+			ledger = self.alpha.broker.get_ledger(self.alpha.name)
+			ledger.reserve(len(ledger) + n_bars)
+
+	def checkpoint(self, path):
+		"""
+		Pickle the runner with its alpha, broker, open orders and 
+		ledgers to path, so the backtest can later be extended over 
+		new bars with BacktestRunner.load(path).extend(end_ts). Pricing 
+		data and api connections are not saved. The alpha class must 
+		be importable when the checkpoint is loaded.
+		"""
+		tmp = path + '.tmp'
+		with open(tmp, 'wb') as handle:
+			pickle.dump(self, handle, protocol = pickle.HIGHEST_PROTOCOL)
+		os.replace(tmp, path)
+
+	@staticmethod
+	def load(path):
+		with open(path, 'rb') as handle:
+			return pickle.load(handle)
+
+	def extend(self, end_ts=None):
+		"""
+		Move the run window to the bars after the last completed one, 
+		up to end_ts. Call run afterwards: the alpha picks up with the 
+		state it ended with instead of being prepared again, so the 
+		results match a single run over the whole period.
+		"""
+		if end_ts is None:
+			end_ts = ts_utils.cur_ts(self.freq)
+
+		if type(end_ts)==str:
+			end_ts = pd.to_datetime(end_ts)
+
+		assert end_ts >= self.end_ts, "end_ts must be >= the checkpoint end_ts"
+
+		self.start_ts = self.end_ts + ts_utils.get_offset(self.freq)
+		self.end_ts = min(ts_utils.cur_ts(self.freq), ts_utils.last_bar(end_ts, self.freq))
+		self.error = None
+		self.resumed = True
+
+	def _finish(self):
+		if self.fast:
+			self._rebuild_ledger()
+
+		self.alpha._finish(save=self.save)
+
+		if self.save:
+			# every saved backtest is kept in the run registry
+			self.alpha.run_id = RunRegistry().record(self.alpha, 
+				self.first_ts, self.end_ts, self.error)
+
+	def _on_crash(self,e):
+		self.error = e
 
 	def _run(self):
 		
@@ -122,7 +222,7 @@ class BacktestRunner(Runner):
 		ts0 =time()
 		while (ts <= self.end_ts):
 
-			if (time() - last_log_ts > 1) or (ts == self.end_ts):
+			if self.verbose and ((time() - last_log_ts > 1) or (ts == self.end_ts)):
 
 				# pct_done = (ts.timestamp() - self.start_ts.timestamp()) \
 				# 	/ (self.end_ts.timestamp() - self.start_ts.timestamp())
@@ -130,31 +230,329 @@ class BacktestRunner(Runner):
 				# if pct_done < 0.99:
 				#pct_done = ("{:.%df}" % 0).format(pct_done*100)
 				#date = ts.strftime('%d-%b-%y %H:%M:%S')
-				pnl = '{:,}'.format(int(self.alpha.get_port_val().iloc[-1]))
 				#logging.info(f'Backtest {pct_done}% Done, Date: {date}, Total PnL: ${pnl}')
 				duration = round(time() - ts0)
+				if self.fast:
+					# pnl is only known once the ledger is rebuilt
+					suffix = f'done | Duration (s): {duration}  '
+				else:
+					pnl = '{:,}'.format(int(self.alpha.broker.get_ledger(
+						self.alpha.name).last_port_val))
+					suffix = f'done | Total PnL ({self.alpha.broker.crncy}): {pnl} | Duration (s): {duration}  '
+				if self.show_timings:
+					suffix += f'| {self.timer.summary()}  '
+
 				print_pct_done(ts.timestamp(), self.start_ts.timestamp(), 
 					self.end_ts.timestamp(),
 					prefix=f'Running {self.alpha.name} backtest:',
-					suffix=f'done | Total PnL ({self.alpha.broker.crncy}): {pnl} | Duration (s): {duration}  ')
+					suffix=suffix)
 
 				last_log_ts = time()
 
-			# pass down backtest params
-			self.alpha.broker.pricing.ts = ts
-			self.alpha.broker.pricing.freq = self.freq
+			self._step(ts)
 
-			# fill orders
-			self.alpha.broker.fill_orders(self.freq)
-			self.alpha.manage_open_orders()
-			self.alpha.rebalance()
-			self.alpha.broker.fill_orders(self.freq,'market')
+			# update ts
+			ts += ts_delta
+
+			if self.wake_ts is not None:
+				ts = self._skip(ts)
+
+	def _step(self, ts, strategy=None):
+		# one bar of the backtest. strategy limits fills to that 
+		# strategy's orders when the broker is shared
+
+		# pass down backtest params
+		self.alpha.broker.pricing.ts = ts
+		self.alpha.broker.pricing.freq = self.freq
+
+		timer = self.timer
+		t0 = timer.clock()
+
+		# fill orders
+		self.alpha.broker.fill_orders(self.freq, strategy = strategy)
+		t1 = timer.clock()
+		self.alpha.manage_open_orders()
+		t2 = timer.clock()
+		wake_ts = self.alpha.rebalance()
+		t3 = timer.clock()
+		self.alpha.broker.fill_orders(self.freq,'market', strategy = strategy)
+		t4 = timer.clock()
 
-			# update pos 
+		# update pos 
+		if not self.fast:
 			self.alpha.snap_port()
+		self.last_ts = ts
+		t5 = timer.clock()
+
+		if wake_ts is not None:
+			self.wake_ts = pd.Timestamp(wake_ts)
+
+		timer.add('fill_orders', t1 - t0)
+		timer.add('manage_open_orders', t2 - t1)
+		timer.add('rebalance', t3 - t2)
+		timer.add('fill_market', t4 - t3)
+		timer.add('snap_port', t5 - t4)
+
+	def _skip(self, ts):
+		"""
+		Move the clock from bar ts to the wake up time rebalance 
+		returned. Bars in between are not run unless a resting limit 
+		order trades on one of them, found by scanning their prices 
+		at once, in which case the clock stops at that bar. Nothing 
+		is skipped while market orders are open. Snapshots of the 
+		skipped bars are added in one go.
+		"""
+		wake_ts = self.wake_ts
+		self.wake_ts = None
+
+		if not ts_utils.is_fixed(self.freq):
+			return ts
+
+		step = ts_utils.freq_ns(self.freq)
+		wake_ts = min(ts_utils.next_bar(wake_ts, self.freq), 
+			self.end_ts + pd.Timedelta(step, 'ns'))
+
+		broker = self.alpha.broker
+		book = broker._orders
+
+		if (wake_ts <= ts) or len(book.symbols(market=True, limit=False)):
+			return ts
+
+		for symbol in book.symbols(market=False, limit=True):
+			# bars ending at ts up to the one before wake_ts
+			open_ts = broker.pricing.first_cross(symbol, self.freq, 
+				ts.value - step, wake_ts.value - 2*step, 
+				book.best_bid(symbol), book.best_ask(symbol))
+
+			if open_ts is not None:
+				wake_ts = min(wake_ts, pd.Timestamp(open_ts + step))
+
+		if wake_ts > ts:
+			# as the fill pass on the first skipped bar would
+			for order in book.new_orders():
+				book.mark_open(order)
+
+			if not self.fast:
+				self._snap_skipped(ts, wake_ts)
+			self.last_ts = wake_ts - pd.Timedelta(step, 'ns')
+
+		return wake_ts
+
+	def _snap_skipped(self, start_ts, end_ts):
+		# snapshots of unchanged positions at bars start_ts to before 
+		# end_ts, valued at once
+		alpha = self.alpha
+		broker = alpha.broker
+		crncy = broker.crncy
+		pricing = broker.pricing
+
+		pos = broker.get_pos(alpha.name)
+		grid = np.arange(start_ts.value, end_ts.value, ts_utils.freq_ns(self.freq))
+		port_val = np.full(len(grid), float(pos.get(crncy, 0)))
+
+		assets = [x for x in pos if x != crncy]
+		if len(assets):
+			symbols = ['%s/%s' % (x, crncy) for x in assets]
+
+			# prices at the last bar run stand in for missing bars
+			last = [pricing.get_current_price(x) for x in symbols]
+
+			pricing.ts = pd.Timestamp(grid[-1])
+			pricing.freq = self.freq
+			close = pricing.get_lastn_panel(symbols, len(grid), self.freq).values
+			close = pd.DataFrame(np.vstack([last, close])).ffill().values[1:]
+
+			port_val += (close*np.array([pos[x] for x in assets])).sum(axis=1)
+
+		ledger = broker.get_ledger(alpha.name)
+		ledger.extend(grid, pd.DataFrame(np.tile(list(pos.values()), (len(grid), 1)), 
+			columns = list(pos)), port_val)
+
+		if alpha.writer is not None:
+			alpha.writer.flush(broker, alpha.name)
+
+	def _rebuild_ledger(self):
+		"""
+		Fast mode: snapshot every bar run at once from the fills. 
+
+		Position changes of the strategy's filled orders are summed 
+		per asset in the order they were processed, starting from 
+		the last ledger row, so positions come out as they were 
+		during the run. The last value of each asset at every bar is 
+		valued at the last close, as get_port_val.
+		"""
+		if self.last_ts is None:
+			return
+
+		alpha = self.alpha
+		broker = alpha.broker
+		crncy = broker.crncy
+		ledger = broker.get_ledger(alpha.name)
+
+		step = ts_utils.freq_ns(self.freq)
+		grid = np.arange(self.start_ts.value, self.last_ts.value + 1, step)
+
+		start = ledger.pos_frame().iloc[-1]
+		fills = broker.blotter.to_frame(alpha.name)
+		if not fills.empty:
+			fills = fills[(fills['qty_filled'] != 0) 
+				& (fills['end_ts'] >= self.start_ts)]
+
+		if fills.empty:
+			ts = np.empty(0, dtype=np.int64)
+			assets = np.empty(0, dtype=object)
+			deltas = np.empty(0)
 
-			# update ts
-			ts += ts_delta
+		else:
+			# base, quote and fee change of each fill, as update_pos
+			mult = np.where(fills['side'] == 'buy', 1, -1)
+			ts = np.repeat(fills['end_ts'].values.astype('datetime64[ns]')
+				.view(np.int64), 3)
+			assets = np.stack([fills['base'].values, fills['quote'].values, 
+				fills['quote'].values], axis=1).ravel()
+			deltas = np.stack([fills['qty_filled'].values*mult, 
+				fills['ntn_filled'].values*mult*-1, 
+				-fills['fee'].values], axis=1).ravel()
+
+		changes = pd.DataFrame({
+			'ts': np.r_[np.full(len(start), grid[0] - 1), ts],
+			'asset': np.r_[start.index.values.astype(object), assets],
+			'qty': np.r_[start.values, deltas],
+			})
+		columns = list(pd.unique(changes['asset']))
+
+		if len(changes):
+			# plain running sums: += during the run does not compensate
+			for asset, rows in changes.groupby('asset', sort=False).indices.items():
+				changes.loc[rows, 'qty'] = np.cumsum(changes['qty'].values[rows])
+
+			pos = changes.groupby(['ts','asset'], sort=False)['qty'].last()\
+				.unstack('asset').ffill()
+			pos = pos.reindex(columns = columns)\
+				.reindex(grid, method='ffill').fillna(0)
+		else:
+			pos = pd.DataFrame(index = grid)
+
+		# a snapshot adds the assets held at the time, so assets are 
+		# added by the first bar they are held at
+		held = pos.values != 0
+		first = np.where(held.any(axis=0), held.argmax(axis=0), len(grid))
+		new = [i for i in np.argsort(first, kind='stable') 
+			if (columns[i] not in ledger.assets) and first[i] < len(grid)]
+		columns = [x for x in columns if x in ledger.assets] \
+			+ [columns[i] for i in new]
+		pos = pos[columns]
+
+		assets = [x for x in columns if x != crncy]
+		port_val = pos[crncy].values.copy() if crncy in columns else np.zeros(len(grid))
+
+		if len(assets):
+			pricing = broker.pricing
+			pricing.ts = self.last_ts
+			pricing.freq = self.freq
+
+			# one more bar for positions held from before start_ts
+			close = pricing.get_lastn_panel(['%s/%s' % (x, crncy) for x in assets],
+				len(grid) + 1, self.freq).ffill().values[1:]
+
+			held = pos[assets].values
+			port_val += np.where(held != 0, held*close, 0).sum(axis=1)
+
+		ledger.extend(grid, pos.reset_index(drop=True), port_val)
+
+class MultiBacktestRunner(Runner):
+	"""
+	Backtests several alphas sharing one broker in a single pass.
+
+	One clock walks the union of every alpha's bar schedule and at 
+	each step only the alphas whose freq lands on it are run, in the 
+	order given. Pricing data, bar indexes and snapshots are loaded 
+	once and shared by all alphas. Each alpha only fills its own 
+	orders on its own bars, so its positions, pnl and fills match a 
+	standalone backtest. Order ids come from the broker's shared 
+	counter and so differ from a standalone run. Wake times returned 
+	by rebalance are ignored: every alpha runs on each of its bars.
+	"""
+
+	def __init__(self, alphas, start_ts=None, end_ts=None, 
+		save=True, verbose=True):
+
+		assert len(alphas), "alphas must not be empty"
+		assert len({id(x.broker) for x in alphas}) == 1, \
+			"alphas must share one broker"
+		assert len({x.name for x in alphas}) == len(alphas), \
+			"alpha names must be unique"
+
+		Runner.__init__(self, alphas[0], None)
+
+		self.alphas = alphas
+		self.save = save
+		self.verbose = verbose
+		self.error = None
+
+		self.runners = [BacktestRunner(x, start_ts, end_ts, save=save,
+			verbose=False) for x in alphas]
+
+		self.start_ts = min(x.start_ts for x in self.runners)
+		self.end_ts = max(x.end_ts for x in self.runners)
+
+	@property
+	def broker(self):
+		return self.alpha.broker
+
+	def _prepare(self):
+		for runner in self.runners:
+			self.broker.pricing.ts = runner.init_ts
+			self.broker.pricing.freq = runner.freq
+			runner._prepare()
+
+	def _finish(self):
+		for runner in self.runners:
+			runner._finish()
+
+	def _on_crash(self,e):
+		self.error = e
+		for runner in self.runners:
+			runner.error = e
+
+	def _run(self):
+
+		# (next bar, position in self.runners) for each alpha
+		schedule = [(x.start_ts, i) for i, x in enumerate(self.runners)
+			if x.start_ts <= x.end_ts]
+		heapq.heapify(schedule)
+
+		last_log_ts = time()
+		ts0 = time()
+
+		while len(schedule):
+
+			ts = schedule[0][0]
+			due = []
+			while len(schedule) and (schedule[0][0] == ts):
+				due.append(heapq.heappop(schedule)[1])
+
+			for i in sorted(due):
+				runner = self.runners[i]
+				# no clock skipping here, runner.wake_ts is never read
+				runner._step(ts, strategy = runner.alpha.name)
+
+				next_ts = ts + ts_utils.get_offset(runner.freq)
+				if next_ts <= runner.end_ts:
+					heapq.heappush(schedule, (next_ts, i))
+
+			if self.verbose and ((time() - last_log_ts > 1) or not len(schedule)):
+
+				pnl = sum(self.broker.get_ledger(x.name).last_port_val 
+					for x in self.alphas)
+				pnl = '{:,}'.format(int(pnl))
+				duration = round(time() - ts0)
+				print_pct_done(ts.timestamp(), self.start_ts.timestamp(), 
+					self.end_ts.timestamp(),
+					prefix=f'Running {len(self.alphas)} alpha backtest:',
+					suffix=f'done | Total PnL ({self.broker.crncy}): {pnl} | Duration (s): {duration}  ')
+
+				last_log_ts = time()
 
 
 		
@@ -0,0 +1,153 @@
+from .backtest import BacktestBinance
+from .runner import BacktestRunner
+from twsq.analytics import summarize
+from twsq.utils import ts_utils
+from itertools import product
+import multiprocessing as mp
+import pandas as pd 
+import logging 
+
+BROKER_PARAMS = ('taker_fee','maker_fee','slip')
+
+# broker whose pricing the configs run in a process read bars from
+_state = {}
+
+def expand_grid(grid):
+	"""
+	List of configs from a dict of lists (every combination) 
+	or from a list of dicts (used as is).
+	"""
+	if isinstance(grid, dict):
+		keys = list(grid)
+		return [dict(zip(keys, values)) 
+			for values in product(*[grid[x] for x in keys])]
+
+	return [dict(x) for x in grid]
+
+def get_pool(processes=None, initializer=None, initargs=()):
+	# forked workers start from the parent's pricing. backtest bars are
+	# memory-mapped from the store, so all processes read one page cache
+	if 'fork' in mp.get_all_start_methods():
+		return mp.get_context('fork').Pool(processes, initializer, initargs)
+	return mp.Pool(processes, initializer, initargs)
+
+def resolve_window(start_ts=None, end_ts=None):
+	"""
+	Absolute start_ts and end_ts, with the defaults of 
+	Alpha.run_backtest. Resolved once before runs are handed out 
+	so every run covers the same bars however long the pool takes.
+	"""
+	if type(end_ts)==str:
+		end_ts = pd.to_datetime(end_ts)
+
+	if type(start_ts)==str:
+		start_ts = pd.to_datetime(start_ts)
+
+	if end_ts is None:
+		# runners round it down to their own last bar
+		end_ts = pd.Timestamp(ts_utils.cur_ts())
+	if start_ts is None:
+		start_ts = end_ts - pd.tseries.offsets.Day()*365
+
+	return start_ts, end_ts
+
+def run_config(Alpha, config, start_ts=None, end_ts=None, connection=None, **kwargs):
+	"""
+	Run one backtest of Alpha without saving results. 
+
+	config and kwargs hold strategy parameters plus optional 
+	freq, name, taker_fee, maker_fee and slip. Values in config 
+	take precedence. connection is a broker whose pricing and api 
+	are reused. Returns the finished alpha and its runner.
+	"""
+	params = dict(kwargs)
+	params.update(config)
+
+	broker = BacktestBinance(*[params.pop(x, None) for x in BROKER_PARAMS],
+		connection = connection)
+	freq = params.pop('freq', '1h')
+	name = params.pop('name', None)
+
+	alpha = Alpha(broker, name = name, freq = freq, **params)
+	runner = BacktestRunner(alpha, start_ts, end_ts, save=False, verbose=False)
+	runner.run()
+	return alpha, runner
+
+def _run_sweep_config(args):
+	Alpha, config, start_ts, end_ts, kwargs = args
+	alpha, runner = run_config(Alpha, config, start_ts, end_ts, 
+		_state.get('connection'), **kwargs)
+
+	res = dict(config)
+	res.update(summarize(alpha.pos_pnl, alpha.orders))
+	res['error'] = None if runner.error is None else str(runner.error)
+	return res
+
+def load_universe(Alpha, freqs, start_ts=None, end_ts=None):
+	"""
+	Sync Alpha.universe once and return the broker holding its bars, 
+	switched to offline so runs reusing it only read the bar store 
+	instead of each downloading from the exchange.
+	"""
+	if not len(Alpha.universe):
+		raise ValueError('Parallel runs need Alpha.universe to be set '
+			'so bars are loaded once')
+
+	freqs = sorted(set(freqs) | set(Alpha.universe_freqs))
+	broker = BacktestBinance()
+	broker.pricing.prefetch(Alpha.universe, freqs, start_ts, end_ts)
+	broker.pricing.offline = True
+	return broker
+
+def _init_worker(connection):
+	# forked workers inherit the loaded pricing. others reconnect 
+	# on unpickling and must stay offline as well
+	connection.pricing.offline = True
+	_state['connection'] = connection
+
+def run_sweep(Alpha, grid, start_ts=None, end_ts=None, processes=None, **kwargs):
+	"""
+	Backtest Alpha for every config in grid across a process pool.
+
+	Parameters
+	----------
+	Alpha : Alpha class
+		Strategy to backtest. Alpha.universe must list every symbol it trades.
+	grid : dict of lists or list of dicts
+		Strategy parameters (and optionally freq, taker_fee, maker_fee, 
+		slip) to sweep. A dict runs every combination.
+	start_ts, end_ts : str, datetime or pandas timestamp, optional
+		Backtest range, as in Alpha.run_backtest.
+	processes : int, optional
+		Number of worker processes. Defaults to the number of cores. 
+		processes=1 runs in the calling process.
+
+	Parameters shared by every config can be passed through **kwargs
+
+	Returns
+	-------
+	DataFrame
+	One row per config with its parameters and summary metrics
+	"""
+
+	configs = expand_grid(grid)
+	freqs = {x.get('freq', kwargs.get('freq','1h')) for x in configs}
+
+	start_ts, end_ts = resolve_window(start_ts, end_ts)
+	connection = load_universe(Alpha, freqs, start_ts, end_ts)
+
+	logging.info(f'Running {len(configs)} {Alpha.__name__} backtests')
+	jobs = [(Alpha, config, start_ts, end_ts, kwargs) for config in configs]
+
+	try:
+		if processes == 1:
+			_init_worker(connection)
+			results = [_run_sweep_config(x) for x in jobs]
+		else:
+			with get_pool(processes, _init_worker, (connection,)) as pool:
+				results = pool.map(_run_sweep_config, jobs, chunksize=1)
+	finally:
+		# don't keep the broker and its bars alive after the sweep
+		_state.pop('connection', None)
+
+	return pd.DataFrame(results)
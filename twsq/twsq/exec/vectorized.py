@@ -0,0 +1,164 @@
+from .runner import BacktestRunner
+from twsq.data.base_prices import INDICATOR_BARS
+from twsq.utils import ts_utils, print_pct_done
+import numpy as np
+import pandas as pd
+from time import time
+
+FIELDS = ('open','high','low','close','volume')
+
+def get_bars_panel(pricing, symbols, freq, start_ts, end_ts):
+	"""
+	Bars of symbols ending start_ts to end_ts as one frame indexed
+	by bar end time, IE. the time rebalance runs at with that bar
+	as its last, with (field, symbol) columns. Missing bars are nan.
+	Leaves pricing at end_ts.
+	"""
+	n_bars = (end_ts - start_ts).value // ts_utils.freq_ns(freq) + 1
+
+	pricing.ts = end_ts
+	pricing.freq = freq
+
+	bars = pd.concat({x: pricing.get_lastn_panel(symbols, n_bars, freq, x)
+		for x in FIELDS}, axis=1)
+	bars.index = bars.index + ts_utils.get_offset(freq)
+	return bars
+
+def value_port(pos, cash, close):
+	# portfolio value per row: cash plus held assets at their last close
+	held = np.where(pos != 0, pos*close, 0)
+	return cash + held.sum(axis=1)
+
+class VectorizedBacktestRunner(BacktestRunner):
+	"""
+	Backtests an alpha from target positions computed over the whole
+	history at once, for strategies whose rebalance only trades to
+	targets that depend on past bars.
+
+	alpha.target_positions gets the bars of Alpha.universe and returns
+	target positions per rebalance time. Every change of target is a
+	market order in broker.crncy filled at the close of the bar ending
+	at that time with slippage and the taker fee, as in BacktestRunner,
+	and the ledger and blotter are filled with array operations so
+	results are read and saved as for any backtest. The one difference
+	is a target set when a symbol has no bar: it is traded at the close
+	of the symbol's next bar instead of at its open.
+	"""
+
+	def _run(self):
+		alpha = self.alpha
+
+		if not ts_utils.is_fixed(self.freq):
+			raise ValueError(f'Vectorized backtests need a fixed length freq, got {self.freq}')
+
+		if not len(alpha.universe):
+			raise ValueError('Vectorized backtests need Alpha.universe to be set')
+
+		if self.start_ts > self.end_ts:
+			return
+
+		timer = self.timer
+		ts0 = time()
+		t0 = timer.clock()
+
+		# history before the first rebalance for lookbacks
+		offset = ts_utils.get_offset(self.freq)
+		bars = get_bars_panel(alpha.broker.pricing, alpha.universe, self.freq,
+			self.start_ts - offset*INDICATOR_BARS, self.end_ts)
+		t1 = timer.clock()
+
+		targets = alpha.target_positions(bars)
+		t2 = timer.clock()
+
+		self._fill_targets(bars, targets)
+		t3 = timer.clock()
+
+		timer.add('load_bars', t1 - t0)
+		timer.add('target_positions', t2 - t1)
+		timer.add('fill_targets', t3 - t2)
+
+		if self.verbose:
+			pnl = '{:,}'.format(int(alpha.broker.get_ledger(alpha.name).last_port_val))
+			duration = round(time() - ts0)
+			print_pct_done(self.end_ts.timestamp(), self.start_ts.timestamp(),
+				self.end_ts.timestamp(),
+				prefix=f'Running {alpha.name} backtest:',
+				suffix=f'done | Total PnL ({alpha.broker.crncy}): {pnl} | Duration (s): {duration}  ')
+
+	def _fill_targets(self, bars, targets):
+		alpha = self.alpha
+		broker = alpha.broker
+		crncy = broker.crncy
+
+		symbols = {x.split('/')[0]: x for x in alpha.universe}
+		missing = [x for x in targets.columns if x not in symbols]
+		if len(missing):
+			raise ValueError(f'Target positions for assets not in Alpha.universe: {missing}')
+
+		bases = np.array(targets.columns, dtype=object)
+		columns = [symbols[x] for x in bases]
+		index = bars.index[(bars.index >= self.start_ts) & (bars.index <= self.end_ts)]
+
+		close = bars['close'][columns].loc[index].values
+		# valuation uses the last close, as get_current_price
+		last_close = bars['close'][columns].ffill().loc[index].values
+
+		# nan targets keep the position. no bar, no trade
+		tgt = targets.reindex(index).ffill().fillna(0).values
+		tgt = np.where(np.isnan(close), np.nan, tgt)
+		pos = pd.DataFrame(tgt).ffill().fillna(0).values
+
+		trd = np.diff(pos, axis=0, prepend=np.zeros((1, len(bases))))
+		traded = trd != 0
+		sign = np.sign(trd)
+
+		avg_px = np.where(traded, close + close*broker.slip*sign, 0)
+		ntn = avg_px*np.abs(trd)
+		fee = ntn*broker.taker_fee
+
+		cash = np.cumsum((-sign*ntn - fee).sum(axis=1))
+		port_val = value_port(pos, cash, last_close)
+
+		# assets in the order they are first traded, the quote
+		# currency after the first one, as positions are updated
+		first = np.where(traded.any(axis=0), traded.argmax(axis=0), len(index))
+		order = [i for i in np.argsort(first, kind='stable') if first[i] < len(index)]
+
+		pos = pd.DataFrame(pos[:, order], columns = bases[order])
+		if len(order):
+			pos.insert(1, crncy, cash)
+
+		ledger = broker.get_ledger(alpha.name)
+		ledger.extend(index.values.astype('datetime64[ns]').view(np.int64),
+			pos, port_val)
+
+		final = {x: y for x, y in pos.iloc[-1].items() if y != 0}
+		broker.pos[alpha.name] = final
+
+		# one market order per target change, by time then target column
+		rows, cols = np.nonzero(traded)
+		first_id = getattr(broker, '_order_id', 0)
+		broker._order_id = first_id + len(rows)
+		qty = np.abs(trd[rows, cols])
+
+		broker.blotter.extend(pd.DataFrame({
+			'strategy': alpha.name,
+			'symbol': [f'{x}/{crncy}' for x in bases[cols]],
+			'qty': qty,
+			'side': np.where(sign[rows, cols] > 0, 'buy', 'sell'),
+			'sec_type': broker._default_sec_type,
+			'limit_price': np.nan,
+			'type': 'market',
+			'custom_id': None,
+			'id': np.arange(first_id, first_id + len(rows)),
+			'status': 'closed',
+			'qty_filled': qty,
+			'ntn_filled': ntn[rows, cols],
+			'avg_px': avg_px[rows, cols],
+			'fee': fee[rows, cols],
+			'start_ts': index[rows],
+			'arrival_px': last_close[rows, cols],
+			'base': bases[cols],
+			'quote': crncy,
+			'end_ts': index[rows],
+			}))
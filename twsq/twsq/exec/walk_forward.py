@@ -0,0 +1,124 @@
+from .sweep import expand_grid, get_pool, load_universe, _init_worker, _run_sweep_config, _state
+import pandas as pd 
+import logging 
+
+def split_windows(start_ts, end_ts, train, test, step = None):
+	"""
+	Rolling (train_start, train_end, test_start, test_end) windows. 
+
+	Each test window starts where its train window ends and windows 
+	move forward by step (defaults to test). Train and test windows end 
+	one tick before the next period starts, so with the default step no 
+	bar is tested twice. Windows whose test period would run past end_ts 
+	are dropped.
+	"""
+	start_ts = pd.to_datetime(start_ts)
+	end_ts = pd.to_datetime(end_ts)
+	train = pd.Timedelta(train)
+	test = pd.Timedelta(test)
+	step = test if step is None else pd.Timedelta(step)
+
+	# end windows one tick early so boundary bars are only counted once
+	tick = pd.Timedelta(1, 'ns')
+
+	windows = []
+	ts = start_ts
+	while ts + train + test <= end_ts:
+		windows.append((ts, ts + train - tick, ts + train, ts + train + test - tick))
+		ts += step
+
+	return windows
+
+def run_walk_forward(Alpha, grid, start_ts, end_ts, train, test, step = None,
+	metric = 'sharpe', minimize = False, processes = None, **kwargs):
+	"""
+	Walk-forward optimization of Alpha.
+
+	For each rolling window every config in grid is backtested on the 
+	train period, the best one by metric is backtested on the following 
+	test period. All windows run in one process pool sharing the bars 
+	loaded up front.
+
+	Parameters
+	----------
+	Alpha : Alpha class
+		Strategy to optimize. Alpha.universe must list every symbol it trades.
+	grid : dict of lists or list of dicts
+		Parameters to search. See run_sweep.
+	start_ts, end_ts : str, datetime or pandas timestamp
+		Range split into windows.
+	train, test : str or Timedelta
+		Length of train and test periods, IE. '90D' and '30D'.
+	step : str or Timedelta, optional
+		How far windows move forward. Defaults to test.
+	metric : str, optional
+		Column of twsq.analytics.summarize used to pick the best config.
+	minimize : bool, optional
+		Pick the config with the lowest metric instead of the highest.
+	processes : int, optional
+		Number of worker processes. Defaults to the number of cores.
+
+	Parameters shared by every config can be passed through **kwargs
+
+	Returns
+	-------
+	DataFrame
+	One row per window with its dates, the chosen parameters, the train 
+	metric and the test summary metrics
+	"""
+
+	configs = expand_grid(grid)
+	windows = split_windows(start_ts, end_ts, train, test, step)
+
+	if not len(windows):
+		raise ValueError('start_ts to end_ts is shorter than one train and test period')
+
+	freqs = {x.get('freq', kwargs.get('freq','1h')) for x in configs}
+	connection = load_universe(Alpha, freqs, windows[0][0], windows[-1][3])
+
+	logging.info(f'Running {Alpha.__name__} walk-forward: {len(windows)} '
+		f'windows x {len(configs)} configs')
+
+	train_jobs = [(Alpha, config, x[0], x[1], kwargs) 
+		for x in windows for config in configs]
+
+	if processes == 1:
+		pool = None
+		_init_worker(connection)
+	else:
+		pool = get_pool(processes, _init_worker, (connection,))
+	map_ = map if pool is None else pool.map
+
+	try:
+		train_res = pd.DataFrame(list(map_(_run_sweep_config, train_jobs)))
+		train_res['window'] = [i for i in range(len(windows)) for _ in configs]
+		train_res['config'] = list(range(len(configs)))*len(windows)
+
+		train_res = train_res[train_res['error'].isnull()]
+		train_res = train_res.dropna(subset = [metric])
+		train_res = train_res.sort_values(metric, ascending = minimize)
+		best = train_res.groupby('window').head(1).set_index('window').sort_index()
+
+		test_jobs = [(Alpha, configs[best.loc[i, 'config']], windows[i][2], 
+			windows[i][3], kwargs) for i in best.index]
+		test_res = list(map_(_run_sweep_config, test_jobs))
+
+	finally:
+		if pool is not None:
+			pool.close()
+			pool.join()
+		_state.pop('connection', None)
+
+	results = []
+	for i, res in zip(best.index, test_res):
+		row = {
+			'train_start': windows[i][0], 
+			'train_end': windows[i][1],
+			'test_start': windows[i][2],
+			'test_end': windows[i][3],
+			f'train_{metric}': best.loc[i, metric],
+			}
+		row.update(res)
+		results.append(row)
+
+	return pd.DataFrame(results)
@@ -29,4 +29,4 @@ def get_data_path():
 ROOT = safe_path(get_data_path())
 ALPHA_PATH = safe_path(ROOT, 'alphas')
 DATA_PATH = safe_path(ROOT, 'data')
-
+RUNS_PATH = safe_path(ROOT, 'runs')
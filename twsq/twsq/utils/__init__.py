@@ -1,2 +1,3 @@
 from .utils import *
-from .ts_utils import ts_utils
\ No newline at end of file
+from .ts_utils import ts_utils
+from .timers import PhaseTimer
\ No newline at end of file
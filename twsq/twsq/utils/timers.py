@@ -0,0 +1,53 @@
+from time import perf_counter_ns
+import pandas as pd 
+
+class PhaseTimer:
+	"""
+	Accumulates wall time and call counts per named phase of a run 
+	loop using the monotonic ns clock. Adding a sample is two dict 
+	updates, so it is cheap enough to leave on for every bar.
+	"""
+
+	clock = staticmethod(perf_counter_ns)
+
+	def __init__(self):
+		self.ns = {}
+		self.calls = {}
+
+	def add(self, phase, ns):
+		self.ns[phase] = self.ns.get(phase, 0) + ns
+		self.calls[phase] = self.calls.get(phase, 0) + 1
+
+	def reset(self):
+		self.ns = {}
+		self.calls = {}
+
+	@property
+	def total_ns(self):
+		return sum(self.ns.values())
+
+	def report(self):
+		"""
+		Frame indexed by phase with calls, total seconds, mean 
+		microseconds per call and share of the timed total.
+		"""
+		total = self.total_ns or 1
+		rows = []
+		for phase, ns in self.ns.items():
+			calls = self.calls[phase]
+			rows.append({
+				'phase': phase,
+				'calls': calls,
+				'total_s': ns/1e9,
+				'mean_us': ns/calls/1e3,
+				'pct': 100*ns/total,
+				})
+
+		return pd.DataFrame(rows, columns = ['phase','calls','total_s',
+			'mean_us','pct']).set_index('phase')
+
+	def summary(self):
+		# short share-of-time string for progress lines
+		total = self.total_ns or 1
+		return ' '.join('%s %d%%' % (phase, round(100*ns/total)) 
+			for phase, ns in self.ns.items())
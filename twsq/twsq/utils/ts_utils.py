@@ -57,6 +57,16 @@ class ts_utils:
 		
 		return offset
 
+	@staticmethod
+	def is_fixed(freq):
+		# minute, hour and day bars have a fixed length
+		return ts_utils._parse_freq(freq)[1] in ('m','h','d')
+
+	@staticmethod
+	def freq_ns(freq):
+		# fixed bar length in nanoseconds (minutes, hours and days only)
+		return pd.Timedelta(ts_utils.pandas_freq(freq)).value
+
 	@staticmethod
 	def _parse_freq(freq):
 		return int(freq[:-1]), freq[-1]
@@ -1,6 +1,7 @@
 import logging 
 import sys 
 import os 
+import shutil
 from datetime import datetime 
 from telegram_handler import TelegramHandler
 from pathlib import Path 
@@ -98,7 +99,7 @@ def print_pct_done(
 	percent_str = (" {:.%df}" % decimals).format(percent)
 	percent_str = percent_str[-decimals - 4 :]
 	
-	terminal_length, _ = os.get_terminal_size()
+	terminal_length, _ = shutil.get_terminal_size()
 	pad = terminal_length - len(prefix) - 1 -len(percent_str) - 2 - len(suffix)
 	line = f"\r{prefix} {percent_str}% {suffix}" + ' '*pad
 	# if value >= end_value: